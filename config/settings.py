@@ -2,10 +2,15 @@
 Configuración global del proyecto CNMC Analyzer.
 """
 
+import functools
+import os
+from datetime import date
 from pathlib import Path
+from types import MappingProxyType
+from typing import Mapping
 
-# Rutas del proyecto
-PROJECT_ROOT = Path(__file__).parent.parent
+# Rutas del proyecto (resueltas una sola vez al importar)
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
 DATA_DIR = PROJECT_ROOT / "data"
 RAW_DIR = DATA_DIR / "raw"
 PROCESSED_DIR = DATA_DIR / "processed"
@@ -20,29 +25,81 @@ REQUEST_TIMEOUT = 30
 REQUEST_DELAY = 2  # segundos entre requests
 MAX_RETRIES = 3
 
+# Concurrencia del fetcher (ThreadPoolExecutor: el trabajo está limitado por I/O)
+HTTP_MAX_WORKERS = 10
+HTTP_PER_HOST_CONCURRENCY = 4
+POLITE_DELAY_JITTER = 0.5  # segundos aleatorios añadidos a REQUEST_DELAY
+
+# Cada cuántos elementos se registra el progreso en INFO en los bucles largos
+# (el detalle por elemento va a DEBUG)
+PROGRESS_LOG_EVERY = 50
+
+
+def _accept_encoding() -> str:
+    """
+    Codificaciones que el cliente sabe descomprimir, por orden de preferencia.
+
+    urllib3 sólo registra los decodificadores br/zstd si `brotli`/`backports.zstd`
+    son importables (extra "fast"); anunciar una codificación que no podemos
+    decodificar dejaría el cuerpo comprimido en response.text.
+    """
+    try:
+        from urllib3.util.request import ACCEPT_ENCODING
+    except ImportError:
+        return "gzip, deflate"
+    available = {enc.strip() for enc in ACCEPT_ENCODING.split(",")}
+    return ", ".join(enc for enc in ("zstd", "br", "gzip", "deflate") if enc in available)
+
+
 # Headers para simular navegador
 DEFAULT_HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
     "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
     "Accept-Language": "es-ES,es;q=0.9,en;q=0.8",
-    "Accept-Encoding": "gzip, deflate, br",
+    "Accept-Encoding": _accept_encoding(),
     "Connection": "keep-alive",
     "Upgrade-Insecure-Requests": "1",
 }
 
-# Filtros por defecto para primera iteración
-DEFAULT_FILTERS = {
+# Año final efectivo ("hasta la fecha actual"), calculado una vez por proceso
+YEAR_TO_EFFECTIVE = date.today().year
+
+# Filtros por defecto para primera iteración (solo lectura: usar get_filters)
+DEFAULT_FILTERS = MappingProxyType({
     "year_from": 2024,
-    "year_to": None,  # None = hasta la fecha actual
+    "year_to": YEAR_TO_EFFECTIVE,
     "tipo_expediente": "Conflictos de acceso - Energía",
     "ambito": "Energía",
-}
+})
+
+
+def get_filters(**overrides) -> Mapping:
+    """
+    Devuelve una copia de DEFAULT_FILTERS con los valores indicados.
+
+    Los overrides a None se ignoran, así que se pueden pasar directamente
+    los argumentos opcionales de la CLI.
+
+    Args:
+        **overrides: Claves de DEFAULT_FILTERS a sustituir
+
+    Returns:
+        Diccionario nuevo con los filtros efectivos
+    """
+    unknown = set(overrides) - set(DEFAULT_FILTERS)
+    if unknown:
+        raise KeyError(f"Filtros desconocidos: {sorted(unknown)}")
+
+    filters = dict(DEFAULT_FILTERS)
+    filters.update((k, v) for k, v in overrides.items() if v is not None)
+    return filters
+
 
 # Keywords para clasificación de resoluciones
 CLASSIFICATION_KEYWORDS = {
-    "DESESTIMADO": ["desestimar", "desestimado", "desestima", "desestimación"],
-    "ESTIMADO": ["estimar", "estimado", "estima", "estimación"],
-    "ARCHIVADO": ["archivar", "archivado", "archiva", "archivo"],
+    "DESESTIMADO": ("desestimar", "desestimado", "desestima", "desestimación"),
+    "ESTIMADO": ("estimar", "estimado", "estima", "estimación"),
+    "ARCHIVADO": ("archivar", "archivado", "archiva", "archivo"),
 }
 
 # Jerarquía para casos con múltiples keywords (mayor prioridad primero)
@@ -51,3 +108,58 @@ CLASSIFICATION_HIERARCHY = ["DESESTIMADO", "ESTIMADO", "ARCHIVADO"]
 # Configuración de cache
 CACHE_ENABLED = True
 CACHE_EXPIRE_HOURS = 24
+# Directorio de caches en disco (texto de PDFs, ver PDF_TEXT_CACHE_DIR). Las
+# descargas van por curl (CurlClient), así que no hay cache HTTP de respuestas
+CACHE_DIR = DATA_DIR / "cache"
+
+# Motor RE2 (google-re2) para los patrones del clasificador que lo admitan
+USE_RE2 = os.environ.get("CNMC_USE_RE2", "0") == "1"
+
+# Prefiltro Hyperscan para los patrones de categoría (si no se usa RE2)
+USE_HYPERSCAN = os.environ.get("CNMC_USE_HYPERSCAN", "0") == "1"
+
+# Clasificar solo el principio y el final de cada texto (caracteres de cada
+# extremo; 0 = texto completo). Acelera PDFs muy largos, pero puede cambiar
+# el resultado si la sección ACUERDA/RESUELVE queda fuera de la ventana
+CLASSIFY_WINDOW_CHARS = int(os.environ.get("CNMC_CLASSIFY_WINDOW", "0"))
+
+# Resultados de classify() que guarda cada clasificador en memoria, por hash
+# del texto (PDFs idénticos en URLs distintas, reprocesados); 0 = sin cache
+CLASSIFY_CACHE_SIZE = int(os.environ.get("CNMC_CLASSIFY_CACHE", "4096"))
+
+# Procesos de ResolutionClassifier.classify_many (la clasificación es CPU y
+# retiene el GIL); 0 = clasificar en el proceso actual
+CLASSIFY_WORKERS = int(os.environ.get("CNMC_CLASSIFY_WORKERS", "0"))
+
+# Cache en disco del texto extraído de cada PDF (<sha1(url)>.txt, .txt.zst con zstd)
+PDF_TEXT_CACHE_ENABLED = True
+PDF_TEXT_CACHE_DIR = CACHE_DIR / "pdf_text"
+
+# Extractor de texto de PDFs: "pdfplumber", "pymupdf" (extra "pymupdf") o
+# "auto" (pymupdf si está instalado; si no, pdfplumber)
+PDF_BACKEND = os.environ.get("CNMC_PDF_BACKEND", "auto")
+
+# Procesos para parsear PDFs (pdfplumber es CPU y retiene el GIL).
+# 0 = parsear en el mismo hilo que descarga
+PDF_PARSE_WORKERS = int(os.environ.get("CNMC_PDF_PARSE_WORKERS", "0"))
+
+# Tiempo máximo (segundos) para extraer el texto de un PDF; 0 = sin límite.
+# Un PDF que lo supera se cuenta como TIMEOUT y no bloquea el resto
+PDF_PARSE_TIMEOUT = float(os.environ.get("CNMC_PDF_PARSE_TIMEOUT", "120"))
+
+# Páginas máximas por PDF (0 = todas). En PDFs más largos se extraen las
+# primeras y las últimas páginas, la mitad del límite de cada extremo (el
+# fallo va al final de la resolución)
+PDF_MAX_PAGES = int(os.environ.get("CNMC_PDF_MAX_PAGES", "0"))
+
+
+@functools.lru_cache(maxsize=1)
+def ensure_dirs() -> None:
+    """Crea los directorios de datos una sola vez por proceso."""
+    for directory in (RAW_DIR, PROCESSED_DIR, OUTPUT_DIR, CACHE_DIR, PDF_TEXT_CACHE_DIR):
+        directory.mkdir(parents=True, exist_ok=True)
+
+
+# CNMC_MKDIR=0 evita tocar el disco al importar (tests, entornos de solo lectura)
+if os.environ.get("CNMC_MKDIR", "1") == "1":
+    ensure_dirs()
@@ -3,13 +3,32 @@ Dashboard interactivo para análisis de expedientes CNMC.
 Ejecutar con: streamlit run dashboard.py
 """
 
+import bisect
+import functools
+import hashlib
+import itertools
 import json
+import re
 from datetime import datetime
 from pathlib import Path
+from typing import Optional
 
+import numpy as np
 import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
 import streamlit as st
 
+try:
+    import ahocorasick  # pyahocorasick (opcional, extra "fast")
+except ImportError:
+    ahocorasick = None
+
+try:
+    import orjson  # opcional, extra "fast"
+except ImportError:
+    orjson = None
+
 # Configuración de página
 st.set_page_config(
     page_title="CNMC Analyzer",
@@ -26,11 +45,172 @@ COLORS = {
     "NO_CLASIFICADO": "#95A5A6",
 }
 
+# Patrones de extract_empresas compartidos con la versión vectorizada
+_RE_INSTADO = re.compile(
+    r'(?:INSTADO|INTERPUESTO|PRESENTADO)\s+POR\s+(?P<reclamante>.+?)\s+(?:FRENTE\s+A|CONTRA)\s+(?P<demandado>.+?)(?:\s*[-,\.]|$)',
+    re.IGNORECASE,
+)
+_RE_INSTADO_SUFIJO = re.compile(r'\s+(?:EN|PARA|POR|SOBRE|RELAT)', re.IGNORECASE)
+_RE_SEPARADORES = [
+    re.compile(r'\s+VS\.?\s+', re.IGNORECASE),
+    re.compile(r'\s+FRENTE\s+A\s+', re.IGNORECASE),
+    re.compile(r'\s+CONTRA\s+', re.IGNORECASE),
+]
+_RE_SEPARADOR_PREFIJO = re.compile(r'^(?:CATR|CONFLICTO DE ACCESO)\s+', re.IGNORECASE)
+_RE_SEPARADOR_SUFIJO = re.compile(r'\s+[-\(]')
+_RE_CATR = re.compile(r'^CATR\s+', re.IGNORECASE)
+_RE_CATR_GUION = re.compile(r'^CATR\s+(.+?)\s{2,}-\s*(.+?)(?:\s*[-\(]|$)', re.IGNORECASE)
+_RE_BARRA_NUMERO = re.compile(r'/\s*\d')
+_RE_PREFIJO_CONFLICTO = re.compile(r'^(?:CATR|CONFLICTO[^/]*)\s+', re.IGNORECASE)
+
+# Caso 3: empresas conocidas en títulos "CATR X" y patrón para recortar el reclamante
+_CATR_EMPRESAS = [
+    (emp, re.compile(rf'\s*-?\s*{emp}.*$', re.IGNORECASE))
+    for emp in ['REE', 'UFD', 'I-DE', 'E-DISTRIBUCIÓN', 'IBERDROLA', 'ENDESA', 'ENAGÁS']
+]
+
+# Caso 5: (búsqueda, recorte del reclamante, nombre) por empresa conocida
+_EMPRESAS_CONOCIDAS = [
+    (re.compile(patron, re.IGNORECASE), re.compile(rf'\s*[-/]?\s*{patron}.*$', re.IGNORECASE), nombre)
+    for patron, nombre in [
+        (r'\bREE\b', 'REE'),
+        (r'\bUFD\b', 'UFD'),
+        (r'I-DE', 'I-DE'),
+        (r'E-DISTRIBUCIÓN', 'E-DISTRIBUCIÓN'),
+        (r'IBERDROLA', 'IBERDROLA'),
+        (r'ENDESA', 'ENDESA'),
+        (r'ENAGÁS', 'ENAGÁS'),
+        (r'VIESGO', 'VIESGO'),
+    ]
+]
+# Todas las anteriores en una sola alternancia: descarta en una pasada los
+# títulos sin ninguna empresa conocida. No sirve para elegir la empresa: manda
+# el orden de la lista, no la posición en el título ("X IBERDROLA ... I-DE").
+_RE_EMPRESAS_CONOCIDAS = re.compile(
+    "|".join(patron.pattern for patron, _, _ in _EMPRESAS_CONOCIDAS), re.IGNORECASE
+)
+
+# normalize_empresa
+_RE_AÑO_SUELTO = re.compile(r'^\d{4}-?\s*\.?$')
+_RE_SUFIJO_SL = re.compile(r'\s*S\.?L\.?U?\.?\s*$', re.IGNORECASE)
+_RE_SUFIJO_SA = re.compile(r'\s*S\.?A\.?U?\.?\s*$', re.IGNORECASE)
+
+# Columnas que load_data convierte a category
+_CATEGORY_COLUMNS = ("resultado_clasificado", "confianza", "demandado", "reclamante", "año_mes")
+# Columnas de texto libre: strings de Arrow (búsqueda con kernels de pyarrow)
+_ARROW_STRING_COLUMNS = ("id", "titulo", "fecha_str")
+
+
+# Tabla de transliteración para comparar nombres sin tildes (una consulta por carácter)
+_DEACCENT = str.maketrans("ÁÉÍÓÚÜÑáéíóúüñ", "AEIOUUNaeiouun")
+
+# Variaciones conocidas de nombres de empresa (el orden importa: gana la primera).
+# Claves en mayúsculas y sin tildes (se comparan contra el nombre pasado por
+# _DEACCENT); los valores conservan la grafía correcta para mostrar
+_NORMALIZACIONES = {
+    # REE
+    "RED ELECTRICA DE ESPANA": "REE",
+    "REE.": "REE",
+    # E-DISTRIBUCIÓN
+    "EDISTRIBUCION REDES DIGITALES S.L.U.": "E-DISTRIBUCIÓN",
+    "E-DISTRIBUCION REDES DIGITALES S.L.U.": "E-DISTRIBUCIÓN",
+    "EDISTRIBUCION REDES DIGITALES": "E-DISTRIBUCIÓN",
+    "E-DISTRIBUCION REDES DIGITALES": "E-DISTRIBUCIÓN",
+    "EDISTRIBUCION": "E-DISTRIBUCIÓN",
+    # I-DE
+    "I-DE REDES ELECTRICAS INTELIGENTES S.A.U.": "I-DE",
+    "I-DE REDES ELECTRICAS INTELIGENTES S.A.": "I-DE",
+    "I-DE REDES ELECTRICAS INTELIGENTES": "I-DE",
+    # UFD
+    "UFD DISTRIBUCION ELECTRICIDAD S.A.": "UFD",
+    "UFD DISTRIBUCION ELECTRICIDAD": "UFD",
+    # IBERDROLA
+    "IBERDROLA DISTRIBUCION ELECTRICA S.A.U.": "IBERDROLA DISTRIBUCIÓN",
+    "IBERDROLA DISTRIBUCION ELECTRICA": "IBERDROLA DISTRIBUCIÓN",
+    "IBERDROLA S": "IBERDROLA",
+    # ENAGÁS
+    "ENAGAS TRANSPORTE S.A.": "ENAGÁS",
+    "ENAGAS TRANSPORTES S.A.": "ENAGÁS",
+    "ENAGAS TRANSPORTE": "ENAGÁS",
+    "ENAGAS GTS": "ENAGÁS",
+    "ENAGAS TRANSPORTE Y ENAGAS GTS": "ENAGÁS",
+    "ENAGAS S": "ENAGÁS",
+    "ENAGAS": "ENAGÁS",
+    # ENDESA
+    "ENDESA DISTRIBUCION": "ENDESA",
+    "ENDESA DISTRIBUCION ELECTRICA": "ENDESA",
+    "ENDESA DISTRIBUCION ELECTRICA S": "ENDESA",
+    # NATURGY / UNIÓN FENOSA
+    "NATURGY IBERIA": "NATURGY",
+    "GAS NATURAL FENOSA": "NATURGY",
+    "UNION FENOSA DISTRIBUCION": "NATURGY",
+    "UNION FENOSA DISTRIBUCION S": "NATURGY",
+    # VIESGO
+    "VIESGO DISTRIBUCION ELECTRICA": "VIESGO",
+    # I-DE variaciones
+    "IDE": "I-DE",
+}
+
+_NORMALIZACIONES_KEYS = list(_NORMALIZACIONES)
+_NORMALIZACIONES_VALUES = list(_NORMALIZACIONES.values())
+
+# Para "nombre in variacion": todas las variaciones en un único string separado
+# por \x00; la posición del primer find() indica la primera variación que lo contiene
+_NORMALIZACIONES_JOINED = "\x00".join(_NORMALIZACIONES_KEYS)
+_NORMALIZACIONES_OFFSETS = list(
+    itertools.accumulate((len(k) + 1 for k in _NORMALIZACIONES_KEYS[:-1]), initial=0)
+)
+
+
+def _build_normalizaciones_automaton():
+    """Autómata Aho-Corasick de variaciones (None si no hay pyahocorasick)."""
+    if ahocorasick is None:
+        return None
+
+    automaton = ahocorasick.Automaton()
+    for index, variacion in enumerate(_NORMALIZACIONES_KEYS):
+        automaton.add_word(variacion, index)
+    automaton.make_automaton()
+    return automaton
 
+
+_NORMALIZACIONES_AUTOMATON = _build_normalizaciones_automaton()
+
+
+def _find_normalizacion(nombre_upper: str) -> int:
+    """
+    Índice de la primera variación que contiene a nombre_upper o está contenida en él.
+
+    nombre_upper debe venir en mayúsculas y sin tildes (ver _DEACCENT).
+
+    Equivale a recorrer _NORMALIZACIONES en orden con
+    `variacion in nombre_upper or nombre_upper in variacion`; devuelve -1 si no hay.
+    """
+    if _NORMALIZACIONES_AUTOMATON is None:
+        for index, variacion in enumerate(_NORMALIZACIONES_KEYS):
+            if variacion in nombre_upper or nombre_upper in variacion:
+                return index
+        return -1
+
+    best = len(_NORMALIZACIONES_KEYS)
+
+    # nombre_upper in variacion
+    if "\x00" not in nombre_upper:
+        pos = _NORMALIZACIONES_JOINED.find(nombre_upper)
+        if pos != -1:
+            best = bisect.bisect_right(_NORMALIZACIONES_OFFSETS, pos) - 1
+
+    # variacion in nombre_upper
+    for _, index in _NORMALIZACIONES_AUTOMATON.iter(nombre_upper):
+        if index < best:
+            best = index
+
+    return best if best < len(_NORMALIZACIONES_KEYS) else -1
+
+
+@functools.lru_cache(maxsize=8192)
 def normalize_empresa(nombre: str) -> str:
     """Normaliza el nombre de una empresa para evitar duplicados."""
-    import re
-
     if not nombre or not isinstance(nombre, str):
         return ""
 
@@ -38,130 +218,68 @@ def normalize_empresa(nombre: str) -> str:
     nombre = " ".join(nombre.split())
 
     # Ignorar patrones que no son empresas (ej: "2007- .")
-    if re.match(r'^\d{4}-?\s*\.?$', nombre):
+    if _RE_AÑO_SUELTO.match(nombre):
         return ""
 
-    # Normalizar variaciones conocidas
-    normalizaciones = {
-        # REE
-        "RED ELECTRICA DE ESPANA": "REE",
-        "RED ELECTRICA DE ESPAÑA": "REE",
-        "RED ELÉCTRICA DE ESPAÑA": "REE",
-        "REE.": "REE",
-        # E-DISTRIBUCIÓN
-        "EDISTRIBUCIÓN REDES DIGITALES S.L.U.": "E-DISTRIBUCIÓN",
-        "EDISTRIBUCION REDES DIGITALES S.L.U.": "E-DISTRIBUCIÓN",
-        "E-DISTRIBUCIÓN REDES DIGITALES S.L.U.": "E-DISTRIBUCIÓN",
-        "E-DISTRIBUCION REDES DIGITALES S.L.U.": "E-DISTRIBUCIÓN",
-        "EDISTRIBUCIÓN REDES DIGITALES": "E-DISTRIBUCIÓN",
-        "E-DISTRIBUCIÓN REDES DIGITALES": "E-DISTRIBUCIÓN",
-        "E-DISTRIBUCION REDES DIGITALES": "E-DISTRIBUCIÓN",
-        "EDISTRIBUCIÓN": "E-DISTRIBUCIÓN",
-        "EDISTRIBUCION": "E-DISTRIBUCIÓN",
-        # I-DE
-        "I-DE REDES ELÉCTRICAS INTELIGENTES S.A.U.": "I-DE",
-        "I-DE REDES ELECTRICAS INTELIGENTES S.A.U.": "I-DE",
-        "I-DE REDES ELÉCTRICAS INTELIGENTES S.A.": "I-DE",
-        "I-DE REDES ELECTRICAS INTELIGENTES S.A.": "I-DE",
-        "I-DE REDES ELECTRICAS INTELIGENTES": "I-DE",
-        "I-DE REDES ELÉCTRICAS INTELIGENTES": "I-DE",
-        # UFD
-        "UFD DISTRIBUCIÓN ELECTRICIDAD S.A.": "UFD",
-        "UFD DISTRIBUCION ELECTRICIDAD S.A.": "UFD",
-        "UFD DISTRIBUCIÓN ELECTRICIDAD": "UFD",
-        # IBERDROLA
-        "IBERDROLA DISTRIBUCIÓN ELÉCTRICA S.A.U.": "IBERDROLA DISTRIBUCIÓN",
-        "IBERDROLA DISTRIBUCION ELECTRICA S.A.U.": "IBERDROLA DISTRIBUCIÓN",
-        "IBERDROLA DISTRIBUCIÓN ELÉCTRICA": "IBERDROLA DISTRIBUCIÓN",
-        "IBERDROLA S": "IBERDROLA",
-        # ENAGÁS
-        "ENAGÁS TRANSPORTE S.A.": "ENAGÁS",
-        "ENAGÁS TRANSPORTES S.A.": "ENAGÁS",
-        "ENAGÁS TRANSPORTE": "ENAGÁS",
-        "ENAGÁS GTS": "ENAGÁS",
-        "ENAGÁS TRANSPORTE Y ENAGÁS GTS": "ENAGÁS",
-        "ENAGAS S": "ENAGÁS",
-        "ENAGAS": "ENAGÁS",
-        # ENDESA
-        "ENDESA DISTRIBUCIÓN": "ENDESA",
-        "ENDESA DISTRIBUCIÓN ELÉCTRICA": "ENDESA",
-        "ENDESA DISTRIBUCIÓN ELÉCTRICA S": "ENDESA",
-        # NATURGY / UNIÓN FENOSA
-        "NATURGY IBERIA": "NATURGY",
-        "GAS NATURAL FENOSA": "NATURGY",
-        "UNIÓN FENOSA DISTRIBUCIÓN": "NATURGY",
-        "UNIÓN FENOSA DISTRIBUCIÓN S": "NATURGY",
-        # VIESGO
-        "VIESGO DISTRIBUCIÓN ELÉCTRICA": "VIESGO",
-        # I-DE variaciones
-        "IDE": "I-DE",
-    }
-
-    nombre_upper = nombre.upper()
-    for variacion, normalizado in normalizaciones.items():
-        if variacion in nombre_upper or nombre_upper in variacion:
-            return normalizado
+    index = _find_normalizacion(nombre.upper().translate(_DEACCENT))
+    if index != -1:
+        return _NORMALIZACIONES_VALUES[index]
 
     # Limpiar sufijos comunes para nombres no normalizados
-    nombre = re.sub(r'\s*S\.?L\.?U?\.?\s*$', '', nombre, flags=re.IGNORECASE)
-    nombre = re.sub(r'\s*S\.?A\.?U?\.?\s*$', '', nombre, flags=re.IGNORECASE)
+    nombre = _RE_SUFIJO_SL.sub('', nombre)
+    nombre = _RE_SUFIJO_SA.sub('', nombre)
 
     return nombre.strip()
 
 
 def extract_empresas(titulo: str) -> tuple[str, str]:
     """Extrae reclamante y demandado del título."""
-    import re
-
     if not titulo or not isinstance(titulo, str):
         return ("", "")
 
     # Caso 1: Títulos descriptivos largos - buscar patrones "INSTADO POR X FRENTE A Y"
-    match = re.search(
-        r'(?:INSTADO|INTERPUESTO|PRESENTADO)\s+POR\s+(.+?)\s+(?:FRENTE\s+A|CONTRA)\s+(.+?)(?:\s*[-,\.]|$)',
-        titulo, re.IGNORECASE
-    )
+    match = _RE_INSTADO.search(titulo)
     if match:
         reclamante = match.group(1).strip()
         demandado = match.group(2).strip()
         # Limpiar sufijos
-        demandado = re.split(r'\s+(?:EN|PARA|POR|SOBRE|RELAT)', demandado, flags=re.IGNORECASE)[0]
+        demandado = _RE_INSTADO_SUFIJO.split(demandado)[0]
         return (normalize_empresa(reclamante), normalize_empresa(demandado))
 
     # Caso 2: Patrón "X VS Y" o "X FRENTE A Y"
-    for sep_pattern in [r'\s+VS\.?\s+', r'\s+FRENTE\s+A\s+', r'\s+CONTRA\s+']:
-        match = re.search(sep_pattern, titulo, re.IGNORECASE)
+    for sep_pattern in _RE_SEPARADORES:
+        match = sep_pattern.search(titulo)
         if match:
-            partes = re.split(sep_pattern, titulo, maxsplit=1, flags=re.IGNORECASE)
+            partes = sep_pattern.split(titulo, maxsplit=1)
             if len(partes) == 2:
                 reclamante = partes[0].strip()
                 demandado = partes[1].strip()
                 # Limpiar prefijos comunes del reclamante
-                reclamante = re.sub(r'^(?:CATR|CONFLICTO DE ACCESO)\s+', '', reclamante, flags=re.IGNORECASE)
+                reclamante = _RE_SEPARADOR_PREFIJO.sub('', reclamante)
                 # Limpiar sufijos del demandado
-                demandado = re.split(r'\s+[-\(]', demandado)[0].strip()
+                demandado = _RE_SEPARADOR_SUFIJO.split(demandado)[0].strip()
                 return (normalize_empresa(reclamante), normalize_empresa(demandado))
 
     # Caso 3: Patrón "CATR X  - Y" (doble espacio + guión)
-    if re.match(r'^CATR\s+', titulo, re.IGNORECASE):
-        match = re.search(r'^CATR\s+(.+?)\s{2,}-\s*(.+?)(?:\s*[-\(]|$)', titulo, re.IGNORECASE)
+    if _RE_CATR.match(titulo):
+        match = _RE_CATR_GUION.search(titulo)
         if match:
             reclamante = match.group(1).strip()
             demandado = match.group(2).strip()
             return (normalize_empresa(reclamante), normalize_empresa(demandado))
         # Si no hay demandado explícito, buscar empresas conocidas
-        empresas_conocidas = ['REE', 'UFD', 'I-DE', 'E-DISTRIBUCIÓN', 'IBERDROLA', 'ENDESA', 'ENAGÁS']
-        for emp in empresas_conocidas:
-            if emp in titulo.upper():
+        titulo_upper = titulo.upper()
+        for emp, emp_sufijo in _CATR_EMPRESAS:
+            if emp in titulo_upper:
                 # El demandado es la empresa conocida, el reclamante es el resto
-                reclamante = re.sub(r'^CATR\s+', '', titulo, flags=re.IGNORECASE)
-                reclamante = re.sub(rf'\s*-?\s*{emp}.*$', '', reclamante, flags=re.IGNORECASE).strip()
+                reclamante = _RE_CATR.sub('', titulo)
+                reclamante = emp_sufijo.sub('', reclamante).strip()
                 return (normalize_empresa(reclamante), emp)
 
     # Caso 4: Separador "/" pero verificar que no sea parte de un número
     if '/' in titulo:
         # Si el "/" va seguido de un número (ej: "11/2005"), no es separador de empresas
-        if not re.search(r'/\s*\d', titulo):
+        if not _RE_BARRA_NUMERO.search(titulo):
             separadores = [" / ", "/ ", " /", "/"]
             for sep in separadores:
                 if sep in titulo:
@@ -180,92 +298,248 @@ def extract_empresas(titulo: str) -> tuple[str, str]:
                     return (normalize_empresa(reclamante), normalize_empresa(demandado))
 
     # Caso 5: Buscar empresas conocidas en títulos sin separador claro
-    empresas_conocidas_patrones = [
-        (r'\bREE\b', 'REE'),
-        (r'\bUFD\b', 'UFD'),
-        (r'I-DE', 'I-DE'),
-        (r'E-DISTRIBUCIÓN', 'E-DISTRIBUCIÓN'),
-        (r'IBERDROLA', 'IBERDROLA'),
-        (r'ENDESA', 'ENDESA'),
-        (r'ENAGÁS', 'ENAGÁS'),
-        (r'VIESGO', 'VIESGO'),
-    ]
-
-    for patron, nombre in empresas_conocidas_patrones:
-        if re.search(patron, titulo, re.IGNORECASE):
+    if _RE_EMPRESAS_CONOCIDAS.search(titulo):
+        for patron, patron_sufijo, nombre in _EMPRESAS_CONOCIDAS:
+            if not patron.search(titulo):
+                continue
             # Si encontramos una empresa conocida, asumimos que es el demandado
             # y el resto es el reclamante (limpiando prefijos)
-            reclamante = re.sub(rf'\s*[-/]?\s*{patron}.*$', '', titulo, flags=re.IGNORECASE)
-            reclamante = re.sub(r'^(?:CATR|CONFLICTO[^/]*)\s+', '', reclamante, flags=re.IGNORECASE)
+            corte = patron_sufijo.search(titulo)
+            # (lo que queda tras corte.end() es, como mucho, un "\n" final)
+            reclamante = titulo[:corte.start()] + titulo[corte.end():] if corte else titulo
+            reclamante = _RE_PREFIJO_CONFLICTO.sub('', reclamante)
             if reclamante.strip():
                 return (normalize_empresa(reclamante.strip()), nombre)
 
     # Si no hay separador ni empresa conocida, solo devolver el título como reclamante
-    reclamante = re.sub(r'^(?:CATR|CONFLICTO[^/]*)\s+', '', titulo, flags=re.IGNORECASE)
+    reclamante = _RE_PREFIJO_CONFLICTO.sub('', titulo)
     return (normalize_empresa(reclamante), "")
 
 
-@st.cache_data
-def load_data() -> pd.DataFrame:
-    """Carga los datos de expedientes analizados."""
-    data_path = Path(__file__).parent / "data" / "processed" / "expedientes_analyzed.json"
+def extract_empresas_series(titulos: pd.Series) -> pd.DataFrame:
+    """
+    Versión vectorizada de extract_empresas para una columna de títulos.
 
-    if not data_path.exists():
-        st.error(f"No se encontró el archivo de datos: {data_path}")
-        return pd.DataFrame()
+    Los casos 1 ("INSTADO POR X FRENTE A Y") y 2 (separadores VS/FRENTE A/
+    CONTRA), que cubren la mayoría de títulos, se resuelven con operaciones
+    .str sobre toda la columna; el resto de filas pasa por extract_empresas.
+    La normalización se hace una vez por nombre distinto.
+
+    Args:
+        titulos: Serie de títulos
+
+    Returns:
+        DataFrame con columnas "reclamante" y "demandado" (mismo índice)
+    """
+    reclamante = pd.Series(pd.NA, index=titulos.index, dtype=object)
+    demandado = pd.Series(pd.NA, index=titulos.index, dtype=object)
+    pendientes = (titulos.str.len() > 0).fillna(False).astype(bool)
+
+    # Caso 1
+    partes = titulos[pendientes].str.extract(_RE_INSTADO)
+    partes = partes[partes["reclamante"].notna()]
+    reclamante[partes.index] = partes["reclamante"].str.strip()
+    demandado[partes.index] = (
+        partes["demandado"].str.strip().str.split(_RE_INSTADO_SUFIJO, n=1).str[0]
+    )
+    pendientes[partes.index] = False
+
+    # Caso 2: el primer separador que aparezca (por orden de la lista) gana
+    for sep_pattern in _RE_SEPARADORES:
+        candidatos = titulos[pendientes]
+        candidatos = candidatos[candidatos.str.contains(sep_pattern)]
+        if candidatos.empty:
+            continue
+        partes = candidatos.str.split(sep_pattern, n=1)
+        reclamante[candidatos.index] = (
+            partes.str[0].str.strip().str.replace(_RE_SEPARADOR_PREFIJO, "", regex=True)
+        )
+        demandado[candidatos.index] = (
+            partes.str[1].str.strip().str.split(_RE_SEPARADOR_SUFIJO, n=1).str[0].str.strip()
+        )
+        pendientes[candidatos.index] = False
+
+    # Normalizar una vez por valor distinto
+    vectorizados = reclamante.notna()
+    nombres = pd.unique(pd.concat([reclamante[vectorizados], demandado[vectorizados]]))
+    normalizados = {nombre: normalize_empresa(nombre) for nombre in nombres}
+    result = pd.DataFrame({
+        "reclamante": reclamante[vectorizados].map(normalizados),
+        "demandado": demandado[vectorizados].map(normalizados),
+    }).reindex(titulos.index)
+
+    # Resto de casos: ruta escalar
+    resto = ~vectorizados
+    if resto.any():
+        result.loc[resto, ["reclamante", "demandado"]] = [
+            extract_empresas(titulo) for titulo in titulos[resto]
+        ]
+
+    return result
 
-    with open(data_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+
+def _build_dataframe(data_path: Path) -> pd.DataFrame:
+    """Construye el DataFrame del dashboard a partir del JSON de expedientes."""
+    if orjson is not None:
+        with open(data_path, "rb") as f:
+            data = orjson.loads(f.read())
+    else:
+        with open(data_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
 
     df = pd.DataFrame(data)
+    del data
+
+    # Resultado y confianza como categorías desde el principio: la ordenación
+    # por fecha solo mueve códigos enteros
+    for col in ("resultado_clasificado", "confianza"):
+        df[col] = df[col].astype("category")
 
-    # Convertir fecha a datetime
-    df["fecha"] = pd.to_datetime(df["fecha"], errors="coerce")
+    # Convertir fecha a datetime y ordenar (el filtro de fechas usa searchsorted).
+    # Las fechas se guardan en ISO (date.isoformat), sin inferir formato.
+    df["fecha"] = pd.to_datetime(df["fecha"], format="ISO8601", errors="coerce")
+    df = df.sort_values("fecha", kind="mergesort").reset_index(drop=True)
 
     # Extraer año y mes para análisis temporal
     df["año"] = df["fecha"].dt.year
     df["mes"] = df["fecha"].dt.month
     df["año_mes"] = df["fecha"].dt.to_period("M").astype(str)
+    # Fecha ya formateada para las tablas (evita strftime en cada rerun)
+    df["fecha_str"] = df["fecha"].dt.strftime("%Y-%m-%d")
 
-    # Extraer empresas del título con normalización
-    empresas = df["titulo"].apply(extract_empresas)
-    df["reclamante"] = empresas.apply(lambda x: x[0])
-    df["demandado"] = empresas.apply(lambda x: x[1])
+    # Extraer empresas del título con normalización (una vez por título distinto)
+    titulos = pd.Series(df["titulo"].dropna().unique())
+    empresas = extract_empresas_series(titulos).set_index(titulos)
+    df["reclamante"] = df["titulo"].map(empresas["reclamante"]).fillna("")
+    df["demandado"] = df["titulo"].map(empresas["demandado"]).fillna("")
 
     # Filtrar filas con demandado vacío para análisis de empresas
     df["tiene_demandado"] = df["demandado"] != ""
 
+    # Columnas con pocos valores distintos: códigos enteros para groupby/filtros
+    for col in _CATEGORY_COLUMNS:
+        df[col] = df[col].astype("category")
+    for col in _ARROW_STRING_COLUMNS:
+        df[col] = df[col].astype("string[pyarrow]")
+
+    return df
+
+
+@st.cache_data
+def load_data() -> pd.DataFrame:
+    """
+    Carga los datos de expedientes analizados.
+
+    El DataFrame ya procesado se guarda en un Parquet junto al JSON y se
+    reutiliza mientras sea más reciente que el JSON y que este fichero
+    (que define las columnas derivadas).
+    """
+    data_path = Path(__file__).parent / "data" / "processed" / "expedientes_analyzed.json"
+
+    if not data_path.exists():
+        st.error(f"No se encontró el archivo de datos: {data_path}")
+        return pd.DataFrame()
+
+    cache_path = data_path.with_suffix(".parquet")
+    source_mtime = max(data_path.stat().st_mtime, Path(__file__).stat().st_mtime)
+
+    if cache_path.exists() and cache_path.stat().st_mtime >= source_mtime:
+        try:
+            return pd.read_parquet(cache_path)
+        except Exception:
+            pass  # Cache corrupta o sin pyarrow: se regenera
+
+    df = _build_dataframe(data_path)
+
+    try:
+        df.to_parquet(cache_path, engine="pyarrow", compression="zstd", index=False)
+    except Exception:
+        pass  # Sin pyarrow o directorio de solo lectura: se sigue sin cache
+
     return df
 
 
+def _df_fingerprint(df: pd.DataFrame) -> bytes:
+    """Huella barata del contenido de un DataFrame para las claves de st.cache_data."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr(list(df.columns)).encode("utf-8"))
+    for col in df.columns:
+        serie = df[col]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            # Categorías + códigos enteros: sin hashear cada valor
+            digest.update(repr(serie.cat.categories.tolist()).encode("utf-8"))
+            digest.update(serie.cat.codes.to_numpy().tobytes())
+        elif isinstance(serie.dtype, np.dtype) and serie.dtype.kind in "biufmM":
+            digest.update(serie.to_numpy().tobytes())
+        else:
+            digest.update(pd.util.hash_pandas_object(serie, index=False).to_numpy().tobytes())
+    return digest.digest()
+
+
+# Cálculos derivados del DataFrame filtrado: se repiten en cada rerun de Streamlit
+# (mover un slider, cambiar de pestaña) aunque los filtros no cambien
+_CACHE_KW = dict(ttl=3600, show_spinner=False, hash_funcs={pd.DataFrame: _df_fingerprint})
+
+
+@st.cache_data(**_CACHE_KW)
+def _resultado_counts(df: pd.DataFrame) -> pd.Series:
+    """Número de expedientes por resultado (solo resultados presentes)."""
+    counts = df["resultado_clasificado"].value_counts()
+    return counts[counts > 0]
+
+
+@st.cache_data(**_CACHE_KW)
+def _timeline_counts(df: pd.DataFrame) -> pd.DataFrame:
+    """Expedientes por mes (filas) y resultado (columnas)."""
+    # crosstab solo incluye las combinaciones presentes (como observed=True)
+    timeline = pd.crosstab(df["año_mes"], df["resultado_clasificado"])
+    return timeline.sort_index()
+
+
+@st.cache_data(show_spinner=False)
+def load_summary() -> dict:
+    """
+    Agregados del DataFrame completo, para la vista sin filtros.
+
+    Se calculan una vez por sesión de datos (igual que load_data), así que
+    la primera vista y los reruns sin filtros no recorren las filas.
+    """
+    df = load_data()
+    return {
+        "total": len(df),
+        "resultados": _resultado_counts(df[["resultado_clasificado"]]),
+        "timeline": _timeline_counts(df[["año_mes", "resultado_clasificado"]]),
+    }
+
+
+# (etiqueta, resultado_clasificado) de los KPIs tras el total
+_KPI_RESULTADOS = [
+    ("Estimados", "ESTIMADO"),
+    ("Desestimados", "DESESTIMADO"),
+    ("Archivados", "ARCHIVADO"),
+    ("Sin Clasificar", "NO_CLASIFICADO"),
+]
+
+
 def render_kpis(df: pd.DataFrame, df_filtered: pd.DataFrame):
     """Renderiza los KPIs principales."""
-    col1, col2, col3, col4, col5 = st.columns(5)
+    col_total, *cols = st.columns(1 + len(_KPI_RESULTADOS))
 
+    # Un único value_counts (compartido con el gráfico de distribución)
     total = len(df_filtered)
-    estimados = len(df_filtered[df_filtered["resultado_clasificado"] == "ESTIMADO"])
-    desestimados = len(df_filtered[df_filtered["resultado_clasificado"] == "DESESTIMADO"])
-    archivados = len(df_filtered[df_filtered["resultado_clasificado"] == "ARCHIVADO"])
-    no_clasif = len(df_filtered[df_filtered["resultado_clasificado"] == "NO_CLASIFICADO"])
+    if total == len(df):
+        counts = load_summary()["resultados"]
+    else:
+        counts = _resultado_counts(df_filtered[["resultado_clasificado"]])
 
-    with col1:
+    with col_total:
         st.metric("Total Expedientes", f"{total:,}")
 
-    with col2:
-        pct = (estimados / total * 100) if total > 0 else 0
-        st.metric("Estimados", f"{estimados:,}", f"{pct:.1f}%")
-
-    with col3:
-        pct = (desestimados / total * 100) if total > 0 else 0
-        st.metric("Desestimados", f"{desestimados:,}", f"{pct:.1f}%")
-
-    with col4:
-        pct = (archivados / total * 100) if total > 0 else 0
-        st.metric("Archivados", f"{archivados:,}", f"{pct:.1f}%")
-
-    with col5:
-        pct = (no_clasif / total * 100) if total > 0 else 0
-        st.metric("Sin Clasificar", f"{no_clasif:,}", f"{pct:.1f}%")
+    for col, (label, resultado) in zip(cols, _KPI_RESULTADOS):
+        n = int(counts.get(resultado, 0))
+        pct = (n / total * 100) if total > 0 else 0
+        with col:
+            st.metric(label, f"{n:,}", f"{pct:.1f}%")
 
 
 def render_sidebar(df: pd.DataFrame) -> pd.DataFrame:
@@ -286,10 +560,11 @@ def render_sidebar(df: pd.DataFrame) -> pd.DataFrame:
         )
         if len(date_range) == 2:
             start_date, end_date = date_range
-            df = df[
-                (df["fecha"].dt.date >= start_date) &
-                (df["fecha"].dt.date <= end_date)
-            ]
+            # load_data devuelve las filas ordenadas por fecha (NaT al final)
+            fechas = df["fecha"].to_numpy()
+            lo = np.searchsorted(fechas, np.datetime64(start_date, "ns"), side="left")
+            hi = np.searchsorted(fechas, np.datetime64(end_date, "ns") + np.timedelta64(1, "D"), side="left")
+            df = df.iloc[lo:hi]
 
     # Filtro de resultado
     st.sidebar.subheader("Resultado")
@@ -315,6 +590,7 @@ def render_sidebar(df: pd.DataFrame) -> pd.DataFrame:
     # Filtro de demandado (empresa contra la que se reclama)
     st.sidebar.subheader("Demandado")
     demandados = df["demandado"].value_counts()
+    demandados = demandados[demandados > 0]  # categorías sin filas tras filtrar
     top_demandados = ["Todos"] + demandados.head(20).index.tolist()
     demandado_sel = st.sidebar.selectbox("Empresa demandada", top_demandados)
     if demandado_sel != "Todos":
@@ -324,63 +600,74 @@ def render_sidebar(df: pd.DataFrame) -> pd.DataFrame:
     st.sidebar.subheader("Búsqueda")
     search_text = st.sidebar.text_input("Buscar en título o ID")
     if search_text:
+        # Búsqueda literal (no regex): "(" o "." en el texto no rompen el filtro
         mask = (
-            df["titulo"].str.contains(search_text, case=False, na=False) |
-            df["id"].str.contains(search_text, case=False, na=False)
+            df["titulo"].str.contains(search_text, case=False, regex=False, na=False) |
+            df["id"].str.contains(search_text, case=False, regex=False, na=False)
         )
-        df = df[mask]
+        df = df[mask.to_numpy(dtype=bool)]
 
     return df
 
 
-def render_distribution_chart(df: pd.DataFrame):
+@st.cache_data(show_spinner=False)
+def _distribution_figures(counts: pd.Series) -> tuple:
+    """Figuras de pastel y barras de la distribución (clave: los conteos, no las filas)."""
+    fig_pie = px.pie(
+        values=counts.values,
+        names=counts.index,
+        color=counts.index,
+        color_discrete_map=COLORS,
+        hole=0.4,
+    )
+    fig_pie.update_traces(textposition="inside", textinfo="percent+label")
+    fig_pie.update_layout(showlegend=False, margin=dict(t=20, b=20, l=20, r=20))
+
+    fig_bar = px.bar(
+        x=counts.index,
+        y=counts.values,
+        color=counts.index,
+        color_discrete_map=COLORS,
+        labels={"x": "Resultado", "y": "Cantidad"},
+    )
+    fig_bar.update_layout(showlegend=False, margin=dict(t=20, b=20, l=20, r=20))
+    return fig_pie, fig_bar
+
+
+def render_distribution_chart(df: pd.DataFrame, summary: Optional[dict] = None):
     """Renderiza gráfico de distribución de resultados."""
     st.subheader("📊 Distribución de Resultados")
 
     # Contar por resultado
-    counts = df["resultado_clasificado"].value_counts()
+    if summary is not None:
+        counts = summary["resultados"]
+    else:
+        counts = _resultado_counts(df[["resultado_clasificado"]])
+
+    fig_pie, fig_bar = _distribution_figures(counts)
 
     col1, col2 = st.columns(2)
 
     with col1:
         # Gráfico de pastel con Streamlit nativo
-        import plotly.express as px
-
-        fig = px.pie(
-            values=counts.values,
-            names=counts.index,
-            color=counts.index,
-            color_discrete_map=COLORS,
-            hole=0.4,
-        )
-        fig.update_traces(textposition="inside", textinfo="percent+label")
-        fig.update_layout(showlegend=False, margin=dict(t=20, b=20, l=20, r=20))
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(fig_pie, use_container_width=True)
 
     with col2:
         # Gráfico de barras
-        fig = px.bar(
-            x=counts.index,
-            y=counts.values,
-            color=counts.index,
-            color_discrete_map=COLORS,
-            labels={"x": "Resultado", "y": "Cantidad"},
-        )
-        fig.update_layout(showlegend=False, margin=dict(t=20, b=20, l=20, r=20))
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(fig_bar, use_container_width=True)
 
 
-def render_timeline_chart(df: pd.DataFrame):
+def render_timeline_chart(df: pd.DataFrame, summary: Optional[dict] = None):
     """Renderiza evolución temporal."""
     st.subheader("📈 Evolución Temporal")
 
     # Agrupar por mes y resultado
-    timeline = df.groupby(["año_mes", "resultado_clasificado"]).size().unstack(fill_value=0)
-    timeline = timeline.sort_index()
+    if summary is not None:
+        timeline = summary["timeline"]
+    else:
+        timeline = _timeline_counts(df[["año_mes", "resultado_clasificado"]])
 
     if not timeline.empty:
-        import plotly.express as px
-
         # Preparar datos para plotly
         timeline_reset = timeline.reset_index().melt(
             id_vars="año_mes",
@@ -441,21 +728,42 @@ def render_empresas_section(df: pd.DataFrame):
         render_empresa_detalle_tab(df_empresas)
 
 
+@st.cache_data(**_CACHE_KW)
+def _empresa_stats(df: pd.DataFrame, rol: str, min_conflictos: int) -> pd.DataFrame:
+    """
+    Cuenta expedientes por empresa y resultado.
+
+    Args:
+        df: Expedientes con empresa válida
+        rol: Columna de empresa ("demandado" o "reclamante")
+        min_conflictos: Mínimo de expedientes para incluir una empresa
+
+    Returns:
+        DataFrame indexado por empresa con Total, Estimados, Desestimados y Archivados
+    """
+    # Total cuenta también los expedientes sin resultado (crosstab los omite)
+    total = df[rol].value_counts(sort=False).sort_index()
+    total = total[total >= min_conflictos]
+
+    ct = pd.crosstab(df[rol], df["resultado_clasificado"])
+    stats = (
+        ct.reindex(index=total.index, columns=["ESTIMADO", "DESESTIMADO", "ARCHIVADO"], fill_value=0)
+        .rename(columns={
+            "ESTIMADO": "Estimados",
+            "DESESTIMADO": "Desestimados",
+            "ARCHIVADO": "Archivados",
+        })
+    )
+    stats.insert(0, "Total", total)
+    stats.columns.name = None
+
+    return stats
+
+
 def render_demandados_tab(df: pd.DataFrame, min_conflictos: int):
     """Tab de análisis de empresas demandadas."""
-    import plotly.express as px
-
     # Calcular estadísticas por demandado
-    stats = df.groupby("demandado").agg({
-        "id": "count",
-        "resultado_clasificado": [
-            lambda x: (x == "ESTIMADO").sum(),
-            lambda x: (x == "DESESTIMADO").sum(),
-            lambda x: (x == "ARCHIVADO").sum(),
-        ]
-    })
-    stats.columns = ["Total", "Estimados", "Desestimados", "Archivados"]
-    stats = stats[stats["Total"] >= min_conflictos].copy()
+    stats = _empresa_stats(df[["demandado", "resultado_clasificado"]], "demandado", min_conflictos)
 
     # Calcular tasas
     stats["Tasa Estimacion"] = (stats["Estimados"] / stats["Total"] * 100).round(1)
@@ -543,19 +851,8 @@ def render_demandados_tab(df: pd.DataFrame, min_conflictos: int):
 
 def render_reclamantes_tab(df: pd.DataFrame, min_conflictos: int):
     """Tab de análisis de empresas reclamantes."""
-    import plotly.express as px
-
     # Calcular estadísticas por reclamante
-    stats = df.groupby("reclamante").agg({
-        "id": "count",
-        "resultado_clasificado": [
-            lambda x: (x == "ESTIMADO").sum(),
-            lambda x: (x == "DESESTIMADO").sum(),
-            lambda x: (x == "ARCHIVADO").sum(),
-        ]
-    })
-    stats.columns = ["Total", "Estimados", "Desestimados", "Archivados"]
-    stats = stats[stats["Total"] >= min_conflictos].copy()
+    stats = _empresa_stats(df[["reclamante", "resultado_clasificado"]], "reclamante", min_conflictos)
 
     # Calcular tasa de éxito (estimaciones conseguidas)
     stats["Tasa Exito"] = (stats["Estimados"] / stats["Total"] * 100).round(1)
@@ -625,13 +922,32 @@ def render_reclamantes_tab(df: pd.DataFrame, min_conflictos: int):
     )
 
 
+@st.cache_data(**_CACHE_KW)
+def _empresas_opciones(df: pd.DataFrame) -> list:
+    """Empresas presentes como demandado o reclamante, ordenadas y sin vacíos."""
+    # Las categorías ya son únicas: basta con descartar las no usadas y unirlas
+    cats = df["demandado"].cat.remove_unused_categories().cat.categories.union(
+        df["reclamante"].cat.remove_unused_categories().cat.categories
+    )
+    return cats[cats != ""].sort_values().tolist()
+
+
+@st.cache_data(**_CACHE_KW)
+def _empresa_expedientes(df_empresa: pd.DataFrame, empresa_sel: str) -> pd.DataFrame:
+    """Tabla de expedientes de una empresa con su rol en cada uno."""
+    return pd.DataFrame({
+        "ID": df_empresa["id"],
+        "Fecha": df_empresa["fecha_str"],
+        "Rol": np.where(df_empresa["demandado"].to_numpy() == empresa_sel, "Demandado", "Reclamante"),
+        "Resultado": df_empresa["resultado_clasificado"],
+        "Título": df_empresa["titulo"],
+    })
+
+
 def render_empresa_detalle_tab(df: pd.DataFrame):
     """Tab de detalle de una empresa específica."""
-    import plotly.express as px
-
     # Obtener lista de empresas (demandados y reclamantes)
-    todas_empresas = set(df["demandado"].unique()) | set(df["reclamante"].unique())
-    todas_empresas = sorted([e for e in todas_empresas if e])
+    todas_empresas = _empresas_opciones(df[["demandado", "reclamante"]])
 
     empresa_sel = st.selectbox("Seleccionar empresa", options=todas_empresas)
 
@@ -639,24 +955,28 @@ def render_empresa_detalle_tab(df: pd.DataFrame):
         return
 
     # Filtrar expedientes donde la empresa es demandada o reclamante
-    df_demandado = df[df["demandado"] == empresa_sel]
-    df_reclamante = df[df["reclamante"] == empresa_sel]
+    mask_demandado = (df["demandado"] == empresa_sel).to_numpy()
+    mask_reclamante = (df["reclamante"] == empresa_sel).to_numpy()
+    n_demandado = int(mask_demandado.sum())
+    n_reclamante = int(mask_reclamante.sum())
+    resultados_demandado = df["resultado_clasificado"][mask_demandado]
+    resultados_reclamante = df["resultado_clasificado"][mask_reclamante]
 
     col1, col2, col3, col4 = st.columns(4)
 
     with col1:
-        st.metric("Como demandado", len(df_demandado))
+        st.metric("Como demandado", n_demandado)
     with col2:
-        st.metric("Como reclamante", len(df_reclamante))
+        st.metric("Como reclamante", n_reclamante)
     with col3:
-        if len(df_demandado) > 0:
-            tasa_est = (df_demandado["resultado_clasificado"] == "ESTIMADO").sum() / len(df_demandado) * 100
+        if n_demandado > 0:
+            tasa_est = (resultados_demandado == "ESTIMADO").sum() / n_demandado * 100
             st.metric("% Estimación (demandado)", f"{tasa_est:.1f}%")
         else:
             st.metric("% Estimación (demandado)", "N/A")
     with col4:
-        if len(df_reclamante) > 0:
-            tasa_exito = (df_reclamante["resultado_clasificado"] == "ESTIMADO").sum() / len(df_reclamante) * 100
+        if n_reclamante > 0:
+            tasa_exito = (resultados_reclamante == "ESTIMADO").sum() / n_reclamante * 100
             st.metric("% Éxito (reclamante)", f"{tasa_exito:.1f}%")
         else:
             st.metric("% Éxito (reclamante)", "N/A")
@@ -664,9 +984,10 @@ def render_empresa_detalle_tab(df: pd.DataFrame):
     col1, col2 = st.columns(2)
 
     with col1:
-        if len(df_demandado) > 0:
+        if n_demandado > 0:
             st.write("**Distribución como demandado**")
-            counts = df_demandado["resultado_clasificado"].value_counts()
+            counts = resultados_demandado.value_counts()
+            counts = counts[counts > 0]
             fig = px.pie(
                 values=counts.values,
                 names=counts.index,
@@ -678,9 +999,10 @@ def render_empresa_detalle_tab(df: pd.DataFrame):
             st.plotly_chart(fig, use_container_width=True)
 
     with col2:
-        if len(df_reclamante) > 0:
+        if n_reclamante > 0:
             st.write("**Distribución como reclamante**")
-            counts = df_reclamante["resultado_clasificado"].value_counts()
+            counts = resultados_reclamante.value_counts()
+            counts = counts[counts > 0]
             fig = px.pie(
                 values=counts.values,
                 names=counts.index,
@@ -692,10 +1014,13 @@ def render_empresa_detalle_tab(df: pd.DataFrame):
             st.plotly_chart(fig, use_container_width=True)
 
     # Evolución temporal
-    df_empresa = pd.concat([df_demandado, df_reclamante]).drop_duplicates(subset=["id"])
+    # Un solo filtro OR; primero los expedientes como demandado, como antes
+    mask_empresa = mask_demandado | mask_reclamante
+    orden = np.argsort(~mask_demandado[mask_empresa], kind="stable")
+    df_empresa = df[mask_empresa].iloc[orden]
     if len(df_empresa) > 0 and df_empresa["fecha"].notna().any():
         st.write("**Evolución temporal de conflictos**")
-        timeline = df_empresa.groupby(["año", "resultado_clasificado"]).size().unstack(fill_value=0)
+        timeline = pd.crosstab(df_empresa["año"], df_empresa["resultado_clasificado"])
 
         if not timeline.empty:
             timeline_reset = timeline.reset_index().melt(
@@ -716,62 +1041,62 @@ def render_empresa_detalle_tab(df: pd.DataFrame):
 
     # Lista de expedientes
     st.write("**Expedientes relacionados**")
-    df_display = df_empresa[["id", "fecha", "titulo", "resultado_clasificado", "demandado", "reclamante"]].copy()
-    df_display["fecha"] = df_display["fecha"].dt.strftime("%Y-%m-%d")
-    df_display["Rol"] = df_display.apply(
-        lambda x: "Demandado" if x["demandado"] == empresa_sel else "Reclamante", axis=1
-    )
     st.dataframe(
-        df_display[["id", "fecha", "Rol", "resultado_clasificado", "titulo"]].rename(columns={
-            "id": "ID",
-            "fecha": "Fecha",
-            "resultado_clasificado": "Resultado",
-            "titulo": "Título",
-        }),
+        _empresa_expedientes(
+            df_empresa[["id", "fecha_str", "titulo", "resultado_clasificado", "demandado"]], empresa_sel
+        ),
         hide_index=True,
         use_container_width=True,
         height=300,
     )
 
 
+@st.cache_data(**_CACHE_KW)
+def _expedientes_csv(df_display: pd.DataFrame) -> bytes:
+    """CSV descargable del listado de expedientes."""
+    return df_display.to_csv(index=False).encode("utf-8")
+
+
 def render_expedientes_table(df: pd.DataFrame):
     """Renderiza la tabla de expedientes."""
     st.subheader("📋 Listado de Expedientes")
 
     # Preparar columnas para mostrar
     display_cols = [
-        "id", "fecha", "titulo", "resultado_clasificado",
+        "id", "fecha_str", "titulo", "resultado_clasificado",
         "confianza", "texto_clave", "demandado"
     ]
 
-    df_display = df[display_cols].copy()
-    df_display["fecha"] = df_display["fecha"].dt.strftime("%Y-%m-%d")
-    df_display = df_display.rename(columns={
-        "id": "ID",
-        "fecha": "Fecha",
-        "titulo": "Título",
-        "resultado_clasificado": "Resultado",
-        "confianza": "Confianza",
-        "texto_clave": "Texto Clave",
-        "demandado": "Demandado",
-    })
+    df_display = (
+        df.loc[:, display_cols]
+        .rename(columns={
+            "id": "ID",
+            "fecha_str": "Fecha",
+            "titulo": "Título",
+            "resultado_clasificado": "Resultado",
+            "confianza": "Confianza",
+            "texto_clave": "Texto Clave",
+            "demandado": "Demandado",
+        })
+    )
 
-    # Colorear por resultado
-    def highlight_resultado(row):
-        color = COLORS.get(row["Resultado"], "#FFFFFF")
-        return [f"background-color: {color}20" if col == "Resultado" else "" for col in row.index]
+    # Colorear por resultado (una sola columna, CSS calculado de una vez)
+    resultado_css = (
+        "background-color: "
+        + df_display["Resultado"].astype(object).map(COLORS).fillna("#FFFFFF")
+        + "20"
+    )
 
     st.dataframe(
-        df_display.style.apply(highlight_resultado, axis=1),
+        df_display.style.apply(lambda _col: resultado_css, subset=["Resultado"]),
         use_container_width=True,
         height=400,
     )
 
     # Botón de descarga
-    csv = df_display.to_csv(index=False).encode("utf-8")
     st.download_button(
         label="📥 Descargar CSV",
-        data=csv,
+        data=_expedientes_csv(df_display),
         file_name=f"expedientes_cnmc_{datetime.now().strftime('%Y%m%d')}.csv",
         mime="text/csv",
     )
@@ -781,15 +1106,21 @@ def render_expediente_detail(df: pd.DataFrame):
     """Renderiza detalle de un expediente específico."""
     st.subheader("🔎 Detalle de Expediente")
 
-    # Selector de expediente
+    # Selector de expediente: id -> primera posición, en una sola pasada
+    ids = df["id"].tolist()
+    titulos = df["titulo"].tolist()
+    posiciones = {}
+    for i, id_ in enumerate(ids):
+        posiciones.setdefault(id_, i)
+
     expediente_id = st.selectbox(
         "Seleccionar expediente",
-        options=df["id"].tolist(),
-        format_func=lambda x: f"{x} - {df[df['id'] == x]['titulo'].values[0][:50]}..."
+        options=ids,
+        format_func=lambda x: f"{x} - {titulos[posiciones[x]][:50]}..."
     )
 
     if expediente_id:
-        exp = df[df["id"] == expediente_id].iloc[0]
+        exp = df.iloc[posiciones[expediente_id]]
 
         col1, col2 = st.columns(2)
 
@@ -822,17 +1153,33 @@ def render_expediente_detail(df: pd.DataFrame):
                 st.link_button("📄 Ver PDF Resolución", exp["url_resolucion"])
 
 
+@st.cache_data(**_CACHE_KW)
+def _confianza_cross(df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Matriz resultado x confianza y porcentajes de confianza por resultado."""
+    # Un único groupby: conteos absolutos (matriz) y porcentajes por fila
+    counts = (
+        df.groupby(["resultado_clasificado", "confianza"], observed=True)
+        .size()
+        .unstack(fill_value=0)
+    )
+
+    # Matriz con márgenes "Total" (equivalente a crosstab(..., margins=True))
+    cross = counts.copy()
+    cross.index = cross.index.astype(object)
+    cross.columns = cross.columns.astype(object)
+    cross["Total"] = cross.sum(axis=1)
+    cross.loc["Total"] = cross.sum(axis=0)
+
+    # Porcentaje de confianza por resultado (sin barra para combinaciones vacías)
+    conf_pct = counts.div(counts.sum(axis=1), axis=0).mul(100).where(counts > 0)
+    return cross, conf_pct
+
+
 def render_confianza_analysis(df: pd.DataFrame):
     """Análisis de confianza de clasificación."""
     st.subheader("🎯 Análisis de Confianza")
 
-    # Cruzar confianza con resultado
-    cross = pd.crosstab(
-        df["resultado_clasificado"],
-        df["confianza"],
-        margins=True,
-        margins_name="Total"
-    )
+    cross, conf_pct = _confianza_cross(df[["resultado_clasificado", "confianza"]])
 
     col1, col2 = st.columns(2)
 
@@ -841,26 +1188,19 @@ def render_confianza_analysis(df: pd.DataFrame):
         st.dataframe(cross, use_container_width=True)
 
     with col2:
-        # Porcentaje de confianza por resultado
-        conf_pct = df.groupby("resultado_clasificado")["confianza"].value_counts(normalize=True).unstack() * 100
-
-        import plotly.express as px
-
-        conf_pct_reset = conf_pct.reset_index().melt(
-            id_vars="resultado_clasificado",
-            var_name="Confianza",
-            value_name="Porcentaje"
-        )
-
-        fig = px.bar(
-            conf_pct_reset,
-            x="resultado_clasificado",
-            y="Porcentaje",
-            color="Confianza",
+        # Porcentaje de confianza por resultado: una traza por nivel, sin pasar por px
+        resultados = [str(r) for r in conf_pct.index]
+        fig = go.Figure([
+            go.Bar(name=str(conf), x=resultados, y=conf_pct[conf].to_numpy(), orientation="v")
+            for conf in conf_pct.columns
+        ])
+        fig.update_layout(
             barmode="stack",
-            labels={"resultado_clasificado": "Resultado"},
+            xaxis_title="Resultado",
+            yaxis_title="Porcentaje",
+            legend_title_text="Confianza",
+            margin=dict(t=20, b=20, l=20, r=20),
         )
-        fig.update_layout(margin=dict(t=20, b=20, l=20, r=20))
         st.plotly_chart(fig, use_container_width=True)
 
 
@@ -884,6 +1224,9 @@ def main():
         st.warning("No hay expedientes que coincidan con los filtros seleccionados.")
         return
 
+    # Sin filtros activos los agregados son los del DataFrame completo
+    summary = load_summary() if len(df_filtered) == len(df) else None
+
     # KPIs
     render_kpis(df, df_filtered)
 
@@ -899,11 +1242,11 @@ def main():
     ])
 
     with tab1:
-        render_distribution_chart(df_filtered)
+        render_distribution_chart(df_filtered, summary)
         render_confianza_analysis(df_filtered)
 
     with tab2:
-        render_timeline_chart(df_filtered)
+        render_timeline_chart(df_filtered, summary)
 
     with tab3:
         render_empresas_section(df_filtered)
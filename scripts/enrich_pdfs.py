@@ -4,16 +4,17 @@ Script para enriquecer expedientes existentes con URLs de resolución PDF.
 """
 
 import argparse
-import json
 import logging
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 # Añadir el directorio raíz al path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from config.settings import PROCESSED_DIR
+from config.settings import HTTP_MAX_WORKERS, PROCESSED_DIR, PROGRESS_LOG_EVERY
 from src.extraction.scraper import CNMCScraper
+from src.utils.json_io import dump_json, load_json
 
 logging.basicConfig(
     level=logging.INFO,
@@ -21,10 +22,14 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Cada cuántas fichas consultadas se guarda el progreso (si hay cambios)
+CHECKPOINT_EVERY = 500
+
 
 def enrich_with_pdfs(
     input_file: str,
     output_file: str = None,
+    max_workers: int = HTTP_MAX_WORKERS,
 ):
     """
     Enriquece expedientes existentes con URLs de resolución PDF.
@@ -32,6 +37,7 @@ def enrich_with_pdfs(
     Args:
         input_file: Archivo de entrada con expedientes
         output_file: Archivo de salida (si no se especifica, sobrescribe el de entrada)
+        max_workers: Hilos para obtener fichas de expediente en paralelo
     """
     input_path = PROCESSED_DIR / input_file
     output_path = PROCESSED_DIR / (output_file or input_file)
@@ -40,8 +46,7 @@ def enrich_with_pdfs(
         raise FileNotFoundError(f"No se encontró el archivo: {input_path}")
 
     # Cargar expedientes
-    with open(input_path, "r", encoding="utf-8") as f:
-        expedientes = json.load(f)
+    expedientes = load_json(input_path)
 
     logger.info(f"Expedientes cargados: {len(expedientes)}")
 
@@ -58,44 +63,63 @@ def enrich_with_pdfs(
         "errores": 0,
     }
 
-    with CNMCScraper() as scraper:
-        for i, exp in enumerate(expedientes, 1):
-            # Saltar si ya tiene URL de resolución
-            if exp.get("url_resolucion"):
-                continue
+    pendientes = []
+    for i, exp in enumerate(expedientes, 1):
+        # Saltar si ya tiene URL de resolución
+        if exp.get("url_resolucion"):
+            continue
 
-            exp_id = exp.get("id", "N/A")
-            exp_url = exp.get("url")
+        if not exp.get("url"):
+            logger.warning(f"[{i}/{len(expedientes)}] Sin URL de expediente: {exp.get('id', 'N/A')}")
+            stats["errores"] += 1
+            continue
 
-            if not exp_url:
-                logger.warning(f"[{i}/{len(expedientes)}] Sin URL de expediente: {exp_id}")
-                stats["errores"] += 1
-                continue
+        pendientes.append(exp)
+
+    logger.info(f"Fichas de expediente a consultar: {len(pendientes)}")
+
+    # Hay URLs nuevas sin guardar desde el último checkpoint
+    dirty = False
 
-            logger.info(f"[{i}/{len(expedientes)}] Obteniendo detalles: {exp_id}")
+    with CNMCScraper() as scraper, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Las peticiones van en paralelo (el cliente HTTP aplica el rate limit);
+        # los expedientes solo se modifican en el hilo principal
+        futures = {
+            executor.submit(scraper.get_expediente_detail, exp["url"]): exp
+            for exp in pendientes
+        }
+
+        for i, future in enumerate(as_completed(futures), 1):
+            exp = futures[future]
 
             try:
-                details = scraper.get_expediente_detail(exp_url)
+                details = future.result()
                 if details and details.get("url_resolucion"):
                     exp["url_resolucion"] = details["url_resolucion"]
                     stats["urls_encontradas"] += 1
-                    logger.info(f"  URL encontrada: {details['url_resolucion'][:70]}...")
+                    dirty = True
+                    logger.debug(f"{exp.get('id', 'N/A')}: {details['url_resolucion'][:70]}...")
                 else:
                     stats["sin_url"] += 1
-                    logger.warning(f"  No se encontró URL de resolución")
+                    logger.warning(f"No se encontró URL de resolución: {exp.get('id', 'N/A')}")
             except Exception as e:
-                logger.error(f"  Error: {e}")
+                logger.error(f"Error en {exp.get('id', 'N/A')}: {e}")
                 stats["errores"] += 1
 
-            # Guardar progreso cada 50 expedientes
-            if i % 50 == 0:
-                with open(output_path, "w", encoding="utf-8") as f:
-                    json.dump(expedientes, f, ensure_ascii=False, indent=2)
-                logger.info(f"  Progreso guardado ({i}/{len(expedientes)})")
+            if i % PROGRESS_LOG_EVERY == 0 or i == len(pendientes):
+                logger.info(
+                    f"[{i}/{len(pendientes)}] Fichas consultadas "
+                    f"({stats['urls_encontradas']} URLs nuevas)"
+                )
+
+            # Guardar progreso (escritura atómica) solo si hay algo nuevo
+            if dirty and i % CHECKPOINT_EVERY == 0:
+                dump_json(expedientes, output_path)
+                dirty = False
+                logger.info(f"  Progreso guardado ({i}/{len(pendientes)})")
 
     # Guardar resultados finales
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(expedientes, f, ensure_ascii=False, indent=2)
+    dump_json(expedientes, output_path)
 
     logger.info(f"Datos guardados en: {output_path}")
 
@@ -112,12 +136,16 @@ def main():
     parser = argparse.ArgumentParser(description="Enriquecer expedientes con URLs de PDF")
     parser.add_argument("--input", type=str, required=True, help="Archivo de entrada")
     parser.add_argument("--output", type=str, help="Archivo de salida (opcional)")
+    parser.add_argument(
+        "--workers", type=int, default=HTTP_MAX_WORKERS, help="Peticiones en paralelo"
+    )
 
     args = parser.parse_args()
 
     enrich_with_pdfs(
         input_file=args.input,
         output_file=args.output,
+        max_workers=args.workers,
     )
 
 
@@ -5,12 +5,16 @@ Script principal para ejecutar el pipeline completo.
 
 import argparse
 import logging
+import queue
 import sys
+import threading
 from pathlib import Path
 
 # Añadir el directorio raíz al path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from config.settings import HTTP_MAX_WORKERS
+from src.extraction.pdf_handler import get_pdf_handler
 from scripts.run_extraction import run_extraction
 from scripts.run_analysis import run_analysis
 from scripts.run_reporting import run_reporting
@@ -21,6 +25,51 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Expedientes pendientes de precarga entre extracción y descarga de PDFs
+PREFETCH_QUEUE_SIZE = 200
+
+
+def _run_extraction_with_prefetch(max_workers: int = HTTP_MAX_WORKERS, **extraction_kwargs):
+    """
+    Ejecuta la extracción mientras descarga en segundo plano los PDFs encontrados.
+
+    Cada URL de resolución pasa por una cola acotada a un pool de hilos que
+    extrae su texto con el PDFHandler compartido; el texto queda en la cache
+    de disco, así que el análisis posterior no vuelve a descargar nada.
+    """
+    pdf_handler = get_pdf_handler(use_cache=True)
+    pending = queue.Queue(maxsize=PREFETCH_QUEUE_SIZE)
+
+    def _prefetch_worker():
+        while True:
+            url = pending.get()
+            if url is None:
+                return
+            try:
+                pdf_handler.extract_text_from_url(url)
+            except Exception as e:
+                logger.warning(f"Precarga de PDF fallida {url}: {e}")
+
+    workers = [
+        threading.Thread(target=_prefetch_worker, name=f"pdf-prefetch-{i}", daemon=True)
+        for i in range(max_workers)
+    ]
+    for worker in workers:
+        worker.start()
+
+    def _on_expediente(exp):
+        if exp.url_resolucion:
+            pending.put(exp.url_resolucion)
+
+    try:
+        run_extraction(on_expediente=_on_expediente, **extraction_kwargs)
+    finally:
+        # Un centinela por hilo: terminan al vaciar la cola
+        for _ in workers:
+            pending.put(None)
+        for worker in workers:
+            worker.join()
+
 
 def run_pipeline(
     year_from: int = 2024,
@@ -31,6 +80,7 @@ def run_pipeline(
     skip_extraction: bool = False,
     skip_analysis: bool = False,
     skip_reporting: bool = False,
+    serial: bool = False,
 ):
     """
     Ejecuta el pipeline completo de extracción, análisis y reporting.
@@ -44,6 +94,7 @@ def run_pipeline(
         skip_extraction: Si True, omite la extracción
         skip_analysis: Si True, omite el análisis
         skip_reporting: Si True, omite el reporting
+        serial: Si True, no solapa la descarga de PDFs con la extracción
     """
     logger.info("=" * 60)
     logger.info("PIPELINE DE ANÁLISIS DE RESOLUCIONES CNMC")
@@ -52,13 +103,18 @@ def run_pipeline(
     # 1. EXTRACCIÓN
     if not skip_extraction:
         logger.info("\n>>> PASO 1: EXTRACCIÓN <<<\n")
-        run_extraction(
+        extraction_kwargs = dict(
             year_from=year_from,
             year_to=year_to,
             tipo_expediente=tipo_expediente,
             ambito=ambito,
             max_pages=max_pages,
         )
+        if serial or skip_analysis:
+            run_extraction(**extraction_kwargs)
+        else:
+            # Los PDFs se descargan mientras sigue la extracción
+            _run_extraction_with_prefetch(**extraction_kwargs)
     else:
         logger.info("\n>>> PASO 1: EXTRACCIÓN (OMITIDO) <<<\n")
 
@@ -109,6 +165,9 @@ Ejemplos de uso:
     parser.add_argument("--skip-extraction", action="store_true", help="Omitir extracción")
     parser.add_argument("--skip-analysis", action="store_true", help="Omitir análisis")
     parser.add_argument("--skip-reporting", action="store_true", help="Omitir reporting")
+    parser.add_argument(
+        "--serial", action="store_true", help="Ejecutar las etapas sin solapar descargas"
+    )
 
     args = parser.parse_args()
 
@@ -121,6 +180,7 @@ Ejemplos de uso:
         skip_extraction=args.skip_extraction,
         skip_analysis=args.skip_analysis,
         skip_reporting=args.skip_reporting,
+        serial=args.serial,
     )
 
 
@@ -5,17 +5,26 @@ Descarga PDFs y los clasifica en: ESTIMADO, DESESTIMADO, ARCHIVADO.
 """
 
 import argparse
-import json
 import logging
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from collections import Counter
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from config.settings import PROCESSED_DIR, OUTPUT_DIR
-from src.extraction.pdf_handler import PDFHandler
-from src.analysis.classifier import ResolutionClassifier
+from config.settings import (
+    CLASSIFY_WINDOW_CHARS,
+    HTTP_MAX_WORKERS,
+    OUTPUT_DIR,
+    PDF_PARSE_WORKERS,
+    PROCESSED_DIR,
+    PROGRESS_LOG_EVERY,
+)
+from src.extraction.pdf_handler import PDFParseTimeout, get_pdf_handler
+from src.analysis.classifier import CLASSIFIER_VERSION, ResolutionClassifier
+from src.reporting.csv_generator import write_summary_csv
+from src.utils.json_io import dump_json, jsonl_line, load_json, load_jsonl
 
 logging.basicConfig(
     level=logging.INFO,
@@ -23,10 +32,90 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Campos que escribe el análisis (se copian al reutilizar un resultado previo)
+RESULT_FIELDS = ("resultado_clasificado", "confianza", "texto_clave", "version_clasificador")
+
+
+def _classifier_stamp(window: int) -> str:
+    """
+    Valor de version_clasificador para los resultados de esta ejecución.
+
+    Incluye la ventana (--window): un resultado clasificado sobre parte del
+    texto no vale para una ejecución con el texto completo ni con otra ventana.
+    """
+    if window <= 0:
+        return CLASSIFIER_VERSION
+    return f"{CLASSIFIER_VERSION}-w{window}"
+
+
+def _is_reusable(exp: dict, stamp: str) -> bool:
+    """Indica si el expediente ya tiene una clasificación válida con este sello."""
+    return (
+        exp.get("resultado_clasificado") not in (None, "", "NO_CLASIFICADO")
+        and exp.get("version_clasificador") == stamp
+    )
+
+
+def _load_previous_results(output_path: Path, stamp: str) -> dict:
+    """Resultados reutilizables de una ejecución anterior, indexados por id."""
+    if not output_path.exists():
+        return {}
+
+    try:
+        previous = load_json(output_path)
+    except Exception as e:
+        logger.warning(f"No se pudieron leer resultados previos de {output_path}: {e}")
+        return {}
+
+    return {exp["id"]: exp for exp in previous if exp.get("id") and _is_reusable(exp, stamp)}
+
+
+def _windowed(text: str, window: int) -> str:
+    """Principio y final del texto (window caracteres de cada extremo); 0 = completo."""
+    if window <= 0 or len(text) <= 2 * window:
+        return text
+    return text[:window] + "\n" + text[-window:]
+
+
+def _partial_path(output_path: Path) -> Path:
+    """Checkpoint JSONL que se va escribiendo durante el análisis."""
+    return output_path.with_name(output_path.name + ".partial.jsonl")
+
+
+def _ends_with_newline(path: Path) -> bool:
+    """Indica si el fichero termina en salto de línea."""
+    with open(path, "rb") as f:
+        f.seek(-1, 2)
+        return f.read(1) == b"\n"
+
+
+def _load_partial_results(partial_path: Path, stamp: str) -> dict:
+    """Resultados del checkpoint de una ejecución interrumpida, indexados por id."""
+    if not partial_path.exists():
+        return {}
+
+    try:
+        records = load_jsonl(partial_path)
+    except OSError as e:
+        logger.warning(f"No se pudo leer el checkpoint {partial_path}: {e}")
+        return {}
+
+    return {
+        rec["id"]: rec
+        for rec in records
+        if rec.get("id") and rec.get("version_clasificador") == stamp
+    }
+
 
 def run_analysis(
     input_file: str = "expedientes_raw.json",
     output_file: str = "expedientes_analyzed.json",
+    use_cache: bool = True,
+    max_workers: int = HTTP_MAX_WORKERS,
+    force: bool = False,
+    parse_workers: int = PDF_PARSE_WORKERS,
+    resume: bool = True,
+    window: int = CLASSIFY_WINDOW_CHARS,
 ) -> dict:
     """
     Ejecuta el análisis de resoluciones.
@@ -34,6 +123,12 @@ def run_analysis(
     Args:
         input_file: Archivo de entrada con expedientes
         output_file: Archivo de salida
+        use_cache: Si True, reutiliza el texto de PDFs ya extraído en disco
+        max_workers: Hilos para descargar y extraer PDFs en paralelo
+        force: Si True, reclasifica también los expedientes ya clasificados
+        parse_workers: Procesos para parsear PDFs (0 = en los hilos de descarga)
+        resume: Si True, continúa desde el checkpoint de una ejecución interrumpida
+        window: Caracteres del principio y del final que se clasifican (0 = todo)
 
     Returns:
         Diccionario con estadísticas
@@ -46,74 +141,144 @@ def run_analysis(
         logger.error(f"No se encontró: {input_path}")
         return {}
 
-    with open(input_path, "r", encoding="utf-8") as f:
-        expedientes = json.load(f)
+    expedientes = load_json(input_path)
 
     logger.info(f"Expedientes cargados: {len(expedientes)}")
 
     # Inicializar
     classifier = ResolutionClassifier()
-    pdf_handler = PDFHandler()
+    pdf_handler = get_pdf_handler(use_cache=use_cache, parse_workers=parse_workers)
 
     # Contador de resultados
     results = Counter()
     processed = 0
 
-    # Contar expedientes con URL de resolucion
-    expedientes_con_pdf = [e for e in expedientes if e.get("url_resolucion")]
-    total_con_pdf = len(expedientes_con_pdf)
-    logger.info(f"Expedientes con PDF a analizar: {total_con_pdf}")
+    output_path = PROCESSED_DIR / output_file
+    stamp = _classifier_stamp(window)
+    previous = {} if force else _load_previous_results(output_path, stamp)
+
+    # Cada PDF clasificado se añade al checkpoint: si la ejecución se
+    # interrumpe, la siguiente retoma desde ahí
+    partial_path = _partial_path(output_path)
+    partial = _load_partial_results(partial_path, stamp) if resume else {}
 
-    for i, exp in enumerate(expedientes, 1):
-        if not exp.get("url_resolucion"):
+    # Agrupar por URL los expedientes con resolución (saltando los ya
+    # clasificados con la versión actual del clasificador, salvo --force).
+    # Varios expedientes pueden compartir resolución (duplicados, resoluciones
+    # conjuntas): cada URL se descarga y clasifica una sola vez
+    por_url = {}
+    total_con_pdf = 0
+    reused = 0
+    resumed = 0
+    for exp in expedientes:
+        url = exp.get("url_resolucion")
+        if not url:
             continue
+        exp_id = exp.get("id")
 
-        # Descargar PDF y extraer texto
-        logger.info(f"[{processed + 1}/{total_con_pdf}] Procesando: {exp.get('id', 'N/A')}...")
-        text = pdf_handler.extract_text_from_url(exp["url_resolucion"])
-        if not text:
-            logger.warning(f"  No se pudo extraer texto del PDF")
-            results["ERROR"] += 1
+        done = partial.get(exp_id)
+        if done is not None and done.get("url_resolucion") == url:
+            for field in RESULT_FIELDS:
+                exp[field] = done.get(field)
+            results[exp["resultado_clasificado"]] += 1
+            resumed += 1
             continue
 
-        # Clasificar
-        result = classifier.classify(text)
+        if not force:
+            prev = previous.get(exp_id)
+            if prev is not None and prev.get("url_resolucion") == url:
+                for field in RESULT_FIELDS:
+                    exp[field] = prev.get(field)
+            if _is_reusable(exp, stamp):
+                results[exp["resultado_clasificado"]] += 1
+                reused += 1
+                continue
+
+        por_url.setdefault(url, []).append(exp)
+        total_con_pdf += 1
+
+    if resumed:
+        logger.info(f"Retomados del checkpoint {partial_path.name}: {resumed}")
+    if reused:
+        logger.info(f"Clasificaciones reutilizadas (v{stamp}): {reused}")
+    logger.info(f"Expedientes con PDF a analizar: {total_con_pdf}")
+
+    total_urls = len(por_url)
+    if total_urls < total_con_pdf:
+        logger.info(f"PDFs distintos a descargar: {total_urls}")
+
+    def _fetch(url):
+        """
+        Descarga el PDF y extrae su texto (se ejecuta en un hilo del pool).
+
+        Returns:
+            Tupla (url, texto, timeout); texto es None si falla o se agota el tiempo
+        """
+        try:
+            return url, pdf_handler.extract_text_from_url(url), False
+        except PDFParseTimeout:
+            return url, None, True
 
-        # Actualizar expediente
-        exp["resultado_clasificado"] = result.categoria
-        exp["confianza"] = result.confianza
-        exp["texto_clave"] = result.texto_clave[:100] if result.texto_clave else ""
+    # Descargas en paralelo (limitadas por I/O; el cliente HTTP aplica el
+    # rate limit por host). La clasificación se hace en el hilo principal.
+    with open(partial_path, "ab" if resume else "wb") as checkpoint, \
+            ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Una línea cortada por la interrupción no debe pegarse a la siguiente
+        if checkpoint.tell() and not _ends_with_newline(partial_path):
+            checkpoint.write(b"\n")
 
-        results[result.categoria] += 1
-        processed += 1
-        logger.info(f"  Resultado: {result.categoria} (confianza: {result.confianza})")
+        futures = [executor.submit(_fetch, url) for url in por_url]
 
-    pdf_handler.close()
+        for i, future in enumerate(as_completed(futures), 1):
+            url, text, timed_out = future.result()
+            exps = por_url[url]
+            if i % PROGRESS_LOG_EVERY == 0 or i == total_urls:
+                logger.info(f"[{i}/{total_urls}] PDFs analizados ({processed} expedientes clasificados)")
+            if timed_out:
+                results["TIMEOUT"] += len(exps)
+                continue
+            if not text:
+                logger.warning(f"No se pudo extraer texto del PDF: {url}")
+                results["ERROR"] += len(exps)
+                continue
+
+            # Clasificar
+            result = classifier.classify(_windowed(text, window))
+
+            # Actualizar expedientes
+            for exp in exps:
+                exp["resultado_clasificado"] = result.categoria
+                exp["confianza"] = result.confianza
+                exp["texto_clave"] = result.texto_clave[:100] if result.texto_clave else ""
+                exp["version_clasificador"] = stamp
+                checkpoint.write(jsonl_line({
+                    "id": exp.get("id"),
+                    "url_resolucion": url,
+                    **{field: exp[field] for field in RESULT_FIELDS},
+                }))
+            checkpoint.flush()
+
+            results[result.categoria] += len(exps)
+            processed += len(exps)
+            if logger.isEnabledFor(logging.DEBUG):
+                ids = ", ".join(exp.get("id", "N/A") for exp in exps)
+                logger.debug(f"{ids}: {result.categoria} (confianza: {result.confianza})")
 
     # Guardar resultados
     PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
-    output_path = PROCESSED_DIR / output_file
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(expedientes, f, ensure_ascii=False, indent=2)
+    dump_json(expedientes, output_path)
+    partial_path.unlink(missing_ok=True)
     logger.info(f"Guardado: {output_path}")
 
     # Generar resumen CSV
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-    summary_file = OUTPUT_DIR / "resumen.csv"
-    total = sum(results.values())
-
-    with open(summary_file, "w", encoding="utf-8") as f:
-        f.write("Resultado,Cantidad,Porcentaje\n")
-        for result, count in sorted(results.items(), key=lambda x: -x[1]):
-            pct = count / total * 100 if total > 0 else 0
-            f.write(f"{result},{count},{pct:.1f}%\n")
-        f.write(f"TOTAL,{total},100%\n")
-
+    summary_file = write_summary_csv(results, OUTPUT_DIR / "resumen.csv")
     logger.info(f"Resumen guardado: {summary_file}")
 
     # Mostrar estadísticas
+    total = sum(results.values())
     logger.info("\n=== RESULTADOS ===")
-    for result, count in sorted(results.items(), key=lambda x: -x[1]):
+    for result, count in results.most_common():
         pct = count / total * 100 if total > 0 else 0
         logger.info(f"  {result}: {count} ({pct:.1f}%)")
     logger.info(f"  TOTAL: {total}")
@@ -135,9 +300,51 @@ def main():
         default="expedientes_analyzed.json",
         help="Archivo de salida"
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=HTTP_MAX_WORKERS,
+        help="Descargas de PDF en paralelo"
+    )
+    parser.add_argument(
+        "--parse-workers",
+        type=int,
+        default=PDF_PARSE_WORKERS,
+        help="Procesos para parsear PDFs (0 = en los hilos de descarga)"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Reclasificar también los expedientes ya clasificados"
+    )
+    parser.add_argument(
+        "--window",
+        type=int,
+        default=CLASSIFY_WINDOW_CHARS,
+        help="Clasificar solo N caracteres del principio y del final de cada PDF (0 = texto completo)"
+    )
+    parser.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="Descartar el checkpoint de una ejecución interrumpida"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignorar la cache de texto de PDFs y volver a descargarlos"
+    )
 
     args = parser.parse_args()
-    run_analysis(input_file=args.input, output_file=args.output)
+    run_analysis(
+        input_file=args.input,
+        output_file=args.output,
+        use_cache=not args.no_cache,
+        max_workers=args.workers,
+        force=args.force,
+        parse_workers=args.parse_workers,
+        resume=not args.no_resume,
+        window=args.window,
+    )
 
 
 if __name__ == "__main__":
@@ -4,18 +4,20 @@ Script para ejecutar la extracción de expedientes de la CNMC.
 """
 
 import argparse
-import json
 import logging
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from typing import Callable, Optional
 
 # Añadir el directorio raíz al path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from config.settings import DEFAULT_FILTERS, PROCESSED_DIR
+from config.settings import HTTP_MAX_WORKERS, PROCESSED_DIR, get_filters
 from src.extraction.scraper import CNMCScraper
 from src.extraction.pdf_handler import PDFHandler
 from src.extraction.models import Expediente
+from src.utils.json_io import dump_json
 
 logging.basicConfig(
     level=logging.INFO,
@@ -32,6 +34,8 @@ def run_extraction(
     max_pages: int = None,
     output_file: str = "expedientes_raw.json",
     extract_pdfs: bool = True,
+    on_expediente: Optional[Callable[[Expediente], None]] = None,
+    max_workers: int = HTTP_MAX_WORKERS,
 ) -> list[Expediente]:
     """
     Ejecuta la extracción de expedientes.
@@ -44,17 +48,27 @@ def run_extraction(
         max_pages: Máximo de páginas a procesar
         output_file: Archivo de salida
         extract_pdfs: Si True, extrae URLs de PDFs
+        on_expediente: Callback opcional con cada expediente ya completo (tras
+            obtener su URL de resolución); permite solapar etapas posteriores
+        max_workers: Hilos para obtener fichas de expediente en paralelo
 
     Returns:
         Lista de expedientes extraídos
     """
     # Usar filtros por defecto si no se especifican
-    year_from = year_from or DEFAULT_FILTERS.get("year_from")
-    tipo_expediente = tipo_expediente or DEFAULT_FILTERS.get("tipo_expediente")
-    ambito = ambito or DEFAULT_FILTERS.get("ambito")
+    filters = get_filters(
+        year_from=year_from,
+        year_to=year_to,
+        tipo_expediente=tipo_expediente,
+        ambito=ambito,
+    )
+    year_from = filters["year_from"]
+    year_to = filters["year_to"]
+    tipo_expediente = filters["tipo_expediente"]
+    ambito = filters["ambito"]
 
     logger.info("=== EXTRACCIÓN DE EXPEDIENTES CNMC ===")
-    logger.info(f"Filtros: año>={year_from}, tipo={tipo_expediente}, ámbito={ambito}")
+    logger.info(f"Filtros: año {year_from}-{year_to}, tipo={tipo_expediente}, ámbito={ambito}")
 
     expedientes = []
 
@@ -68,21 +82,35 @@ def run_extraction(
             reverse=True,  # Empezar por los más recientes
         ):
             expedientes.append(exp)
-            logger.info(f"Extraído: {exp.id} - {exp.titulo[:50] if exp.titulo else 'Sin título'}...")
+            logger.debug(f"Extraído: {exp.id} - {exp.titulo[:50] if exp.titulo else 'Sin título'}...")
 
         # Obtener detalles y URLs de PDFs
         if extract_pdfs:
             total = len(expedientes)
             logger.info(f"Extrayendo URLs de resoluciones PDF de {total} expedientes...")
             pdfs_found = 0
-            for i, exp in enumerate(expedientes, 1):
-                details = scraper.get_expediente_detail(exp.url)
-                if details:
-                    exp.url_resolucion = details.get("url_resolucion")
-                    if exp.url_resolucion:
-                        pdfs_found += 1
-                if i % 10 == 0 or i == total:
-                    logger.info(f"  URLs extraidas: {i}/{total} ({pdfs_found} PDFs encontrados)")
+            # Las fichas se piden en paralelo (el cliente HTTP aplica el rate
+            # limit); los expedientes y el callback, solo en este hilo
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = {
+                    executor.submit(scraper.get_expediente_detail, exp.url): exp
+                    for exp in expedientes
+                }
+                for i, future in enumerate(as_completed(futures), 1):
+                    exp = futures[future]
+                    try:
+                        details = future.result()
+                    except Exception as e:
+                        logger.error(f"Error obteniendo detalles de {exp.id}: {e}")
+                        details = None
+                    if details:
+                        exp.url_resolucion = details.get("url_resolucion")
+                        if exp.url_resolucion:
+                            pdfs_found += 1
+                    if on_expediente is not None:
+                        on_expediente(exp)
+                    if i % 10 == 0 or i == total:
+                        logger.info(f"  URLs extraidas: {i}/{total} ({pdfs_found} PDFs encontrados)")
             logger.info(f"Extraccion de URLs completada: {pdfs_found}/{total} expedientes con PDF")
 
     logger.info(f"Total expedientes extraídos: {len(expedientes)}")
@@ -91,8 +119,7 @@ def run_extraction(
     PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
     output_path = PROCESSED_DIR / output_file
 
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump([exp.to_dict() for exp in expedientes], f, ensure_ascii=False, indent=2)
+    dump_json([exp.to_dict() for exp in expedientes], output_path)
 
     logger.info(f"Datos guardados en: {output_path}")
 
@@ -108,6 +135,9 @@ def main():
     parser.add_argument("--max-pages", type=int, help="Máximo de páginas a procesar")
     parser.add_argument("--output", type=str, default="expedientes_raw.json", help="Archivo de salida")
     parser.add_argument("--no-pdfs", action="store_true", help="No extraer URLs de PDFs")
+    parser.add_argument(
+        "--workers", type=int, default=HTTP_MAX_WORKERS, help="Fichas de expediente en paralelo"
+    )
 
     args = parser.parse_args()
 
@@ -119,6 +149,7 @@ def main():
         max_pages=args.max_pages,
         output_file=args.output,
         extract_pdfs=not args.no_pdfs,
+        max_workers=args.workers,
     )
 
 
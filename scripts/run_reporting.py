@@ -4,7 +4,6 @@ Script para generar informes y reportes.
 """
 
 import argparse
-import json
 import logging
 import sys
 from pathlib import Path
@@ -14,9 +13,14 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from config.settings import PROCESSED_DIR, OUTPUT_DIR
 from src.extraction.models import Expediente
-from src.reporting.csv_generator import generate_csv, generate_summary_csv
+from src.reporting.csv_generator import (
+    expedientes_to_dataframe,
+    generate_csv,
+    generate_summary_csv,
+)
 from src.reporting.excel_generator import generate_excel_report
 from src.reporting.charts import generate_all_charts
+from src.utils.json_io import load_json
 
 logging.basicConfig(
     level=logging.INFO,
@@ -32,8 +36,7 @@ def load_expedientes(input_file: str) -> list[Expediente]:
     if not filepath.exists():
         raise FileNotFoundError(f"No se encontró el archivo: {filepath}")
 
-    with open(filepath, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    data = load_json(filepath)
 
     return [Expediente.from_dict(d) for d in data]
 
@@ -65,10 +68,13 @@ def run_reporting(
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
     generated_files = {}
 
+    # Tabla plana de expedientes, construida una vez para CSV, Excel y gráficos
+    df = expedientes_to_dataframe(expedientes)
+
     # Generar CSV
     if generate_csv_file:
         logger.info("Generando CSV...")
-        csv_path = generate_csv(expedientes)
+        csv_path = generate_csv(expedientes, df=df)
         logger.info(f"  CSV generado: {csv_path}")
         summary_path = generate_summary_csv(expedientes)
         logger.info(f"  Resumen CSV generado: {summary_path}")
@@ -78,14 +84,14 @@ def run_reporting(
     # Generar Excel
     if generate_excel:
         logger.info("Generando Excel...")
-        excel_path = generate_excel_report(expedientes)
+        excel_path = generate_excel_report(expedientes, df=df)
         logger.info(f"  Excel generado: {excel_path}")
         generated_files["excel"] = str(excel_path)
 
     # Generar gráficos
     if generate_charts:
         logger.info("Generando graficos...")
-        chart_paths = generate_all_charts(expedientes)
+        chart_paths = generate_all_charts(expedientes, df=df)
         for chart_path in chart_paths:
             logger.info(f"  Grafico generado: {chart_path}")
         generated_files["charts"] = [str(p) for p in chart_paths]
@@ -6,16 +6,108 @@ según patrones de texto en: ESTIMADO, DESESTIMADO, ARCHIVADO.
 """
 
 import re
+import hashlib
 import logging
+import multiprocessing
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from typing import Optional
 from dataclasses import dataclass
 
-logger = logging.getLogger(__name__)
+import sys
+sys.path.insert(0, str(__file__).rsplit("/", 4)[0])
+from config.settings import CLASSIFY_CACHE_SIZE, CLASSIFY_WORKERS
+from src.analysis.regex_engine import (
+    compile_hyperscan_prefilter,
+    compile_literal_prefilter,
+    compile_pattern,
+    compile_pattern_set,
+    fold_case,
+    lowercase_pattern,
+)
 
+logger = logging.getLogger(__name__)
 
-@dataclass
+# Versión de los patrones de clasificación. Incrementarla al cambiar reglas:
+# run_analysis solo reutiliza resultados previos con la misma versión.
+CLASSIFIER_VERSION = "2"
+
+# Normalización de caracteres tipográficos en una sola pasada (str.translate)
+_NORMALIZE_TABLE = str.maketrans({
+    # Guiones especiales (en-dash, em-dash, signo menos) -> guión normal
+    '\u2013': '-', '\u2014': '-', '\u2212': '-',
+    # Comillas tipográficas Unicode -> comillas ASCII
+    '\u201c': '"', '\u201d': '"',  # " y "
+    '\u2018': "'", '\u2019': "'",  # ' y '
+    '\u00ab': '"', '\u00bb': '"',  # « y »
+    # Puntos suspensivos
+    '\u2026': '...',
+})
+
+# Patrones auxiliares, compilados una vez al importar el módulo
+_RE_PAGE_NUM = re.compile(r'^\d+\s*\n')
+_RE_PAGE_BEFORE_ORD = re.compile(r'^\d+\s+(?=ÚNICO|PRIMERO|Único|Primero)')
+_RE_MULTISPACE = re.compile(r'[^\S\n]+')
+_RE_MULTILINE = re.compile(r'\n{3,}')
+
+_RE_FIRST_POINT = (
+    re.compile(
+        r'^((?:ÚNICO|ÚNICA|PRIMERO|PRIMERA|1º|1\.|I\.)[^\n]*(?:\n(?![A-Z]{4,}\.?\s|SEGUNDO|SEGUNDA|2º|2\.|II\.).*)*)',
+        re.IGNORECASE | re.DOTALL,
+    ),
+    re.compile(r'^(.{50,500}?)(?=SEGUNDO|SEGUNDA|2º|2\.|II\.|$)', re.IGNORECASE | re.DOTALL),
+)
+
+# Patrones del respaldo sin sección: recorren el documento completo, así que
+# pasan por compile_pattern (RE2, en tiempo lineal, si CNMC_USE_RE2=1)
+_RE_SENTENCIA = compile_pattern(
+    r'(?:FALLO|FALLAMOS|Audiencia\s+Nacional|Tribunal\s+Supremo|SENTENCIA)', re.IGNORECASE
+)
+_RE_FALLO = compile_pattern(
+    r'(?:FALLO|FALLAMOS)[:\s]*(.{50,1500}?)(?:Notifíquese|Así\s+(?:por\s+esta|lo\s+pronunciamos)|firmamos|\Z)',
+    re.IGNORECASE | re.DOTALL,
+)
+
+# Respaldo sin sección: patrones de alta confianza en todo el texto
+_HIGH_CONFIDENCE_SOURCES = {
+    "ESTIMADO": (
+        r'(?:se\s+)?estima\s+(?:el\s+)?(?:recurso|conflicto)',
+        r'anulamos\s+(?:la\s+)?resolución',
+        r'reconocer\s+(?:el\s+)?derecho',
+    ),
+    "DESESTIMADO": (
+        r'(?:se\s+)?desestima\s+(?:el\s+)?(?:recurso|conflicto)',
+        r'confirmamos\s+(?:la\s+)?resolución',
+        r'no\s+ha\s+lugar',
+    ),
+    "ARCHIVADO": (
+        r'archivo\s+del\s+procedimiento',
+        r'procedimiento\s+(?:ha\s+)?concluido',
+        r'declarar?\s+concluso',
+        r'informar\s+a\s+.{5,50}\s+que',
+        r'dar\s+traslado',
+        r'se\s+acomoda\s+a\s+(?:la\s+)?(?:citada\s+)?resolución',
+        r'\bINADMITIR\b',
+    ),
+}
+_HIGH_CONFIDENCE_PATTERNS = {
+    cat: tuple(compile_pattern(p, re.IGNORECASE) for p in patterns)
+    for cat, patterns in _HIGH_CONFIDENCE_SOURCES.items()
+}
+
+# Último intento: verbos clave en cualquier parte del texto (\b y el
+# lookahead no existen en RE2: compile_pattern los deja en `re`)
+_LAST_RESORT_PATTERNS = {
+    "DESESTIMADO": compile_pattern(r'\bdesestim(?:ar?|e|ó|ado)\b', re.IGNORECASE),
+    "ESTIMADO": compile_pattern(r'\bestim(?:ar?|e|ó|ado)\b(?!\s*(?:que|conveniente))', re.IGNORECASE),
+    "ARCHIVADO": compile_pattern(r'\b(?:archiv(?:ar?|e|ó|ado)|conclus[oa]|inadmit)\b', re.IGNORECASE),
+}
+
+
+@dataclass(frozen=True)
 class ClassificationResult:
-    """Resultado de la clasificación."""
+    """Resultado de la clasificación (inmutable: classify() lo reutiliza de su cache)."""
     categoria: str
     confianza: str  # "alta", "media", "baja"
     texto_clave: str  # Fragmento que determinó la clasificación
@@ -40,12 +132,24 @@ class ResolutionClassifier:
         r'[.,]\s*\n*(acuerda)[,:\s]*\n+(.{50,800}?)(?=Contra\s+(?:la\s+)?presente|El presente|Madrid,|\Z)',
     ]
 
+    # Toda coincidencia de los patrones de sección contiene una de estas
+    # palabras (con estas mayúsculas): sin ellas no hay sección que buscar
+    SECTION_KEYWORDS = ("ACUERDA", "RESUELVE", "acuerda")
+
     # Categorías y sus patrones (orden de prioridad)
     # IMPORTANTE: Solo hay 3 categorías válidas: ESTIMADO, DESESTIMADO, ARCHIVADO
     CATEGORIES = {
         "ARCHIVADO": [
-            # Declarar concluso/concluido (ambas formas)
-            r'declarar?\s+(?:el\s+)?(?:procedimiento\s+)?conclu(?:so|ido)',
+            # Declarar concluso/concluido, desaparición, falta de competencia,
+            # terminación/finalización, infrautilización (cierra el
+            # procedimiento) o solicitud completa: un solo patrón para que el
+            # prefijo "declarar" se recorra una vez
+            r'declarar?\s+(?:(?:el\s+)?(?:procedimiento\s+)?conclu(?:so|ido)'
+            r'|la\s+desaparición'
+            r'|la\s+falta\s+de\s+competencia'
+            r'|(?:la\s+)?(?:terminación|finalización|infrautilización)'
+            r'|finalizado\s+(?:el\s+)?procedimiento'
+            r'|completa\s+(?:la\s+)?solicitud)',
             r'declare\s+concluso',
             r'aceptar?\s+(?:de\s+plano\s+)?(?:el\s+)?desistimiento',
             r'aceptar,?\s+conforme\s+al\s+artículo\s+94',  # Desistimiento según Ley 39/2015
@@ -53,29 +157,22 @@ class ResolutionClassifier:
             r'archivo\s+(?:de\s+las\s+)?actuaciones',
             r'proceder\s+al\s+archivo',
             r'desaparición\s+(?:sobrevenida\s+)?(?:de\s+(?:su\s+)?)?objeto',
-            r'declarar?\s+la\s+desaparición',
             r'pérdida\s+(?:sobrevenida\s+)?(?:de[l]?\s+)?(?:su\s+)?objeto',
             r'falta\s+de\s+objeto',
             r'inadmitir?\s+(?:a\s+trámite)?',
             r'tener\s+por\s+desistid[oa]',
-            r'declarar?\s+la\s+falta\s+de\s+competencia',
             r'falta\s+de\s+competencia\s+de\s+esta\s+comisión',
             # Terminación/finalización del procedimiento
             r'terminación\s+(?:del\s+)?procedimiento',
-            r'declarar?\s+(?:la\s+)?(?:terminación|finalización)',
-            r'declarar?\s+finalizado\s+(?:el\s+)?procedimiento',
             # Verificación de seguimiento sin incidencias
             r'considerar\s+que.{0,100}no\s+se\s+ha\s+(?:producido|detectado)',
             r'considerar\s+que.{0,50}a\s+la\s+vista.{0,50}no',
             r'no\s+procede\s+(?:la\s+)?(?:suspensión|actuación)',
-            # Declarar infrautilización (cierra el procedimiento)
-            r'declarar?\s+(?:la\s+)?infrautilización',
             # Casos informativos/aclaratorios (antes en RESUELTO)
             r'informar\s+a\s+.{5,80}\s+que',
             r'dar\s+traslado',
             r'corregir\s+(?:el\s+)?(?:párrafo|error)',
             r'aclarar\s+(?:que\s+)?(?:la\s+)?(?:referencia|resolución)',
-            r'declarar?\s+completa\s+(?:la\s+)?solicitud',
             r'considerar\s+que,?\s+conforme\s+a\s+(?:la\s+)?información',
             r'considerar\s+que\s+(?:el\s+)?(?:reparto|reconocimiento)',
             # Remisión a otro órgano
@@ -147,37 +244,118 @@ class ResolutionClassifier:
         ],
     }
 
-    def __init__(self):
-        self._section_patterns_strict = [
-            re.compile(p, re.MULTILINE | re.DOTALL) for p in self.SECTION_PATTERNS_STRICT
-        ]
-        self._section_patterns_flexible = [
-            re.compile(p, re.MULTILINE | re.DOTALL) for p in self.SECTION_PATTERNS_FLEXIBLE
+    # Patrones compilados (strict, flexible, categorías y prefiltro),
+    # compartidos por todas las instancias: se compilan una vez por proceso
+    _compiled_patterns = None
+
+    def __init__(self, cache_size: int = CLASSIFY_CACHE_SIZE):
+        cls = type(self)
+        # Cache LRU de classify(): blake2b(texto) -> ClassificationResult
+        self._cache_size = cache_size
+        self._cache = OrderedDict()
+        # get + move_to_end y la inserción + popitem tienen que ser atómicos:
+        # la misma instancia se puede usar desde varios hilos
+        self._cache_lock = threading.Lock()
+        # __dict__ y no getattr: una subclase con otros patrones compila los suyos
+        if cls.__dict__.get("_compiled_patterns") is None:
+            cls._compiled_patterns = cls._compile_patterns()
+        (
+            self._section_patterns_strict,
+            self._section_patterns_flexible,
+            self._category_flat,
+            self._category_prefilter,
+        ) = cls._compiled_patterns
+
+    @classmethod
+    def _compile_patterns(cls) -> tuple:
+        """Compila los patrones de sección y de categoría de la clase."""
+        # compile_pattern usa RE2 si CNMC_USE_RE2=1 y el patrón lo admite
+        section_strict = tuple(
+            compile_pattern(p, re.MULTILINE | re.DOTALL) for p in cls.SECTION_PATTERNS_STRICT
+        )
+        section_flexible = tuple(
+            compile_pattern(p, re.MULTILINE | re.DOTALL) for p in cls.SECTION_PATTERNS_FLEXIBLE
+        )
+        # Los patrones de categoría se compilan en minúsculas y sin IGNORECASE:
+        # _search_categories los busca sobre el texto pasado por fold_case.
+        # Una sola tupla plana (categoria, patrón) en orden de prioridad,
+        # alineada con el prefiltro, en lugar de un dict de listas
+        flat_sources = [
+            (cat, lowercase_pattern(p)) for cat, patterns in cls.CATEGORIES.items() for p in patterns
         ]
-        self._category_patterns = {
-            cat: [re.compile(p, re.IGNORECASE | re.DOTALL) for p in patterns]
-            for cat, patterns in self.CATEGORIES.items()
-        }
+        flat = tuple((cat, compile_pattern(p, re.DOTALL)) for cat, p in flat_sources)
+        # Prefiltro: re2.Set con RE2 activo; si no, Hyperscan si está
+        # activo; si no, literales obligatorios
+        sources = [p for _, p in flat_sources]
+        prefilter = compile_pattern_set(sources, re.DOTALL)
+        if prefilter is None:
+            prefilter = compile_hyperscan_prefilter(sources, re.DOTALL)
+        if prefilter is None:
+            prefilter = compile_literal_prefilter(sources)
+        return section_strict, section_flexible, flat, prefilter
+
+    def _search_categories(self, text: str) -> Optional[tuple[str, str]]:
+        """
+        Primer patrón de categoría (por orden de prioridad) que aparece en el texto.
+
+        El texto se pasa a minúsculas una sola vez (fold_case) en lugar de que
+        cada patrón compare con IGNORECASE carácter a carácter. Un prefiltro
+        recorre el texto una vez (re2.Set con RE2 activo, Hyperscan con
+        CNMC_USE_HYPERSCAN=1; si no, Aho-Corasick sobre el literal obligatorio
+        de cada patrón) y solo se buscan
+        individualmente los patrones que pueden coincidir y los que el
+        prefiltro no cubre.
+
+        Returns:
+            Tupla (categoria, fragmento) con el fragmento tal cual aparece en
+            el texto original, o None si ningún patrón coincide
+        """
+        folded = fold_case(text)
+
+        if self._category_prefilter is None:
+            candidates = self._category_flat
+        else:
+            hits = self._category_prefilter.matching(folded, folded=True)
+            covered = self._category_prefilter.covered
+            candidates = (
+                entry for index, entry in enumerate(self._category_flat)
+                if index not in covered or index in hits
+            )
+
+        for categoria, pattern in candidates:
+            match = pattern.search(folded)
+            if match:
+                # fold_case conserva la longitud: la posición vale en el original
+                return categoria, text[match.start():match.end()]
+        return None
 
     def _normalize_text(self, text: str) -> str:
         """Normaliza el texto para mejorar la detección de patrones."""
-        # Reemplazar guiones especiales (em-dash, en-dash) por guión normal
-        text = text.replace('\u2013', '-').replace('\u2014', '-').replace('\u2212', '-')
-        text = text.replace('–', '-').replace('—', '-').replace('−', '-')
-        # Normalizar comillas tipográficas Unicode a comillas ASCII
-        text = text.replace('\u201c', '"').replace('\u201d', '"')  # " y "
-        text = text.replace('\u2018', "'").replace('\u2019', "'")  # ' y '
-        text = text.replace('\u00ab', '"').replace('\u00bb', '"')  # « y »
+        # Guiones, comillas tipográficas y puntos suspensivos (ver _NORMALIZE_TABLE)
+        text = text.translate(_NORMALIZE_TABLE)
         # Eliminar números de página sueltos al inicio (ej: "21\nÚNICO")
-        text = re.sub(r'^\d+\s*\n', '', text)
-        text = re.sub(r'^\d+\s+(?=ÚNICO|PRIMERO|Único|Primero)', '', text)
+        text = _RE_PAGE_NUM.sub('', text)
+        text = _RE_PAGE_BEFORE_ORD.sub('', text)
         # Normalizar espacios múltiples en cada línea (preservando saltos de línea)
-        text = re.sub(r'[^\S\n]+', ' ', text)  # Espacios múltiples -> uno solo (sin tocar \n)
-        text = re.sub(r'\n{3,}', '\n\n', text)  # Múltiples líneas vacías -> máximo 2
-        # Normalizar puntos suspensivos
-        text = text.replace('\u2026', '...')
+        text = _RE_MULTISPACE.sub(' ', text)  # Espacios múltiples -> uno solo (sin tocar \n)
+        text = _RE_MULTILINE.sub('\n\n', text)  # Múltiples líneas vacías -> máximo 2
         return text
 
+    @staticmethod
+    def _last_match(patterns: list, text: str):
+        """
+        Devuelve la coincidencia que empieza más tarde entre varios patrones.
+
+        Recorre los finditer sin guardar las coincidencias; en caso de empate
+        gana el patrón posterior de la lista.
+        """
+        last = None
+        for pattern in patterns:
+            for match in pattern.finditer(text):
+                if last is None or match.start() >= last.start():
+                    last = match
+        return last
+
     def _extract_resolution_section(self, text: str) -> Optional[tuple[str, str]]:
         """
         Extrae la sección ACUERDA o RESUELVE del documento.
@@ -185,31 +363,24 @@ class ResolutionClassifier:
         Returns:
             Tupla (tipo_seccion, contenido) o None si no se encuentra
         """
-        # Primero intentar con patrones estrictos
-        strict_matches = []
-        for pattern in self._section_patterns_strict:
-            for match in pattern.finditer(text):
-                strict_matches.append((match.start(), match.group(1), match.group(2)))
+        # Sin ninguna palabra clave (búsqueda de subcadena, sin pasar por el
+        # motor de regex) los patrones no pueden coincidir
+        if not any(keyword in text for keyword in self.SECTION_KEYWORDS):
+            return None
 
-        if strict_matches:
-            strict_matches.sort(key=lambda x: x[0])
-            _, section_type, content = strict_matches[-1]
-            return self._clean_section(section_type, content)
+        # Primero intentar con patrones estrictos
+        match = self._last_match(self._section_patterns_strict, text)
+        if match is not None:
+            return self._clean_section(match.group(1), match.group(2))
 
         # Si no hay matches estrictos, intentar con flexibles
-        flexible_matches = []
-        for pattern in self._section_patterns_flexible:
-            for match in pattern.finditer(text):
-                if match.lastindex >= 3:
-                    content = match.group(2) + match.group(3)
-                else:
-                    content = match.group(2)
-                flexible_matches.append((match.start(), match.group(1), content))
-
-        if flexible_matches:
-            flexible_matches.sort(key=lambda x: x[0])
-            _, section_type, content = flexible_matches[-1]
-            return self._clean_section(section_type, content)
+        match = self._last_match(self._section_patterns_flexible, text)
+        if match is not None:
+            if match.lastindex >= 3:
+                content = match.group(2) + match.group(3)
+            else:
+                content = match.group(2)
+            return self._clean_section(match.group(1), content)
 
         return None
 
@@ -217,18 +388,13 @@ class ResolutionClassifier:
         """Limpia y normaliza el contenido de la sección."""
         section_type = section_type.upper()
         content = content.strip()
-        content = re.sub(r'\n{3,}', '\n\n', content)
+        content = _RE_MULTILINE.sub('\n\n', content)
         return section_type, content
 
     def _extract_first_point(self, section_content: str) -> str:
         """Extrae el primer punto de la resolución (ÚNICO, PRIMERO, etc.)."""
-        patterns = [
-            r'^((?:ÚNICO|ÚNICA|PRIMERO|PRIMERA|1º|1\.|I\.)[^\n]*(?:\n(?![A-Z]{4,}\.?\s|SEGUNDO|SEGUNDA|2º|2\.|II\.).*)*)',
-            r'^(.{50,500}?)(?=SEGUNDO|SEGUNDA|2º|2\.|II\.|$)',
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, section_content, re.IGNORECASE | re.DOTALL)
+        for pattern in _RE_FIRST_POINT:
+            match = pattern.search(section_content)
             if match:
                 return match.group(1).strip()
 
@@ -244,6 +410,64 @@ class ResolutionClassifier:
         Returns:
             ClassificationResult con la categoría y detalles
         """
+        if self._cache_size <= 0:
+            return self._classify(text)
+
+        # Textos idénticos se clasifican una sola vez: el hash cuesta mucho
+        # menos que los patrones
+        key = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+        with self._cache_lock:
+            result = self._cache.get(key)
+            if result is not None:
+                self._cache.move_to_end(key)
+                return result
+
+        # Fuera del lock: dos hilos con el mismo texto lo clasifican dos veces,
+        # pero el resto no espera a los patrones
+        result = self._classify(text)
+        with self._cache_lock:
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def classify_many(
+        self,
+        texts: list[str],
+        workers: int = CLASSIFY_WORKERS,
+        chunksize: int = 16,
+    ) -> list[ClassificationResult]:
+        """
+        Clasifica varias resoluciones en un pool de procesos.
+
+        Los textos repetidos se clasifican una sola vez. Con fork (si el
+        proceso no tiene otros hilos) los workers heredan los patrones ya
+        compilados; con spawn los compila cada worker al arrancar.
+
+        Args:
+            texts: Textos completos de los documentos
+            workers: Procesos del pool (0 o 1 = en este proceso)
+            chunksize: Textos que se envían a cada worker de una vez
+
+        Returns:
+            Un ClassificationResult por texto, en el mismo orden
+        """
+        if workers <= 1 or len(texts) < 2:
+            return [self.classify(text) for text in texts]
+
+        unique = list(dict.fromkeys(texts))
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(unique)),
+            mp_context=_pool_context(),
+            initializer=_init_worker,
+            initargs=(type(self),),
+        ) as pool:
+            results = dict(zip(unique, pool.map(_classify_in_worker, unique, chunksize=chunksize)))
+        return [results[text] for text in texts]
+
+    def _classify(self, text: str) -> ClassificationResult:
+        """Clasificación sin cache (ver classify)."""
         # Normalizar texto antes de procesar
         text = self._normalize_text(text)
 
@@ -257,28 +481,29 @@ class ResolutionClassifier:
         first_point = self._extract_first_point(section_content)
 
         # Buscar patrones de categoría en el primer punto
-        for categoria, patterns in self._category_patterns.items():
-            for pattern in patterns:
-                match = pattern.search(first_point)
-                if match:
-                    return ClassificationResult(
-                        categoria=categoria,
-                        confianza="alta",
-                        texto_clave=match.group(0),
-                        seccion_encontrada=True
-                    )
+        found = self._search_categories(first_point)
+        if found:
+            categoria, texto_clave = found
+            return ClassificationResult(
+                categoria=categoria,
+                confianza="alta",
+                texto_clave=texto_clave,
+                seccion_encontrada=True
+            )
 
         # Si no se encontró en el primer punto, buscar en toda la sección
-        for categoria, patterns in self._category_patterns.items():
-            for pattern in patterns:
-                match = pattern.search(section_content)
-                if match:
-                    return ClassificationResult(
-                        categoria=categoria,
-                        confianza="media",
-                        texto_clave=match.group(0),
-                        seccion_encontrada=True
-                    )
+        # (salvo que el primer punto sea la sección entera: ya se ha buscado)
+        found = None
+        if first_point != section_content:
+            found = self._search_categories(section_content)
+        if found:
+            categoria, texto_clave = found
+            return ClassificationResult(
+                categoria=categoria,
+                confianza="media",
+                texto_clave=texto_clave,
+                seccion_encontrada=True
+            )
 
         return ClassificationResult(
             categoria="NO_CLASIFICADO",
@@ -290,63 +515,38 @@ class ResolutionClassifier:
     def _classify_fallback(self, text: str) -> ClassificationResult:
         """Clasificación de respaldo cuando no se encuentra la sección."""
         # Detectar si es una sentencia judicial
-        is_sentencia = bool(re.search(r'(?:FALLO|FALLAMOS|Audiencia\s+Nacional|Tribunal\s+Supremo|SENTENCIA)', text, re.IGNORECASE))
+        is_sentencia = bool(_RE_SENTENCIA.search(text))
 
         # Para sentencias, buscar en la sección FALLO
         if is_sentencia:
-            fallo_match = re.search(r'(?:FALLO|FALLAMOS)[:\s]*(.{50,1500}?)(?:Notifíquese|Así\s+(?:por\s+esta|lo\s+pronunciamos)|firmamos|\Z)', text, re.IGNORECASE | re.DOTALL)
+            fallo_match = _RE_FALLO.search(text)
             if fallo_match:
-                fallo_text = fallo_match.group(1)
-                for categoria, patterns in self._category_patterns.items():
-                    for pattern in patterns:
-                        match = pattern.search(fallo_text)
-                        if match:
-                            return ClassificationResult(
-                                categoria=categoria,
-                                confianza="media",
-                                texto_clave=f"[SENTENCIA] {match.group(0)}",
-                                seccion_encontrada=False
-                            )
-
-        # Buscar en los últimos 3000 caracteres (aumentado)
-        last_part = text[-3000:]
-        for categoria, patterns in self._category_patterns.items():
-            for pattern in patterns:
-                match = pattern.search(last_part)
-                if match:
+                found = self._search_categories(fallo_match.group(1))
+                if found:
+                    categoria, texto_clave = found
                     return ClassificationResult(
                         categoria=categoria,
-                        confianza="baja",
-                        texto_clave=match.group(0),
+                        confianza="media",
+                        texto_clave=f"[SENTENCIA] {texto_clave}",
                         seccion_encontrada=False
                     )
 
+        # Buscar en los últimos 3000 caracteres (aumentado)
+        last_part = text[-3000:]
+        found = self._search_categories(last_part)
+        if found:
+            categoria, texto_clave = found
+            return ClassificationResult(
+                categoria=categoria,
+                confianza="baja",
+                texto_clave=texto_clave,
+                seccion_encontrada=False
+            )
+
         # Buscar en todo el texto con patrones de alta confianza
-        high_confidence_patterns = {
-            "ESTIMADO": [
-                r'(?:se\s+)?estima\s+(?:el\s+)?(?:recurso|conflicto)',
-                r'anulamos\s+(?:la\s+)?resolución',
-                r'reconocer\s+(?:el\s+)?derecho',
-            ],
-            "DESESTIMADO": [
-                r'(?:se\s+)?desestima\s+(?:el\s+)?(?:recurso|conflicto)',
-                r'confirmamos\s+(?:la\s+)?resolución',
-                r'no\s+ha\s+lugar',
-            ],
-            "ARCHIVADO": [
-                r'archivo\s+del\s+procedimiento',
-                r'procedimiento\s+(?:ha\s+)?concluido',
-                r'declarar?\s+concluso',
-                r'informar\s+a\s+.{5,50}\s+que',
-                r'dar\s+traslado',
-                r'se\s+acomoda\s+a\s+(?:la\s+)?(?:citada\s+)?resolución',
-                r'\bINADMITIR\b',
-            ],
-        }
-
-        for categoria, patterns in high_confidence_patterns.items():
-            for p in patterns:
-                match = re.search(p, text, re.IGNORECASE)
+        for categoria, patterns in _HIGH_CONFIDENCE_PATTERNS.items():
+            for pattern in patterns:
+                match = pattern.search(text)
                 if match:
                     return ClassificationResult(
                         categoria=categoria,
@@ -356,15 +556,9 @@ class ResolutionClassifier:
                     )
 
         # Último intento: buscar verbos clave en cualquier parte del texto
-        last_resort_patterns = {
-            "DESESTIMADO": r'\bdesestim(?:ar?|e|ó|ado)\b',
-            "ESTIMADO": r'\bestim(?:ar?|e|ó|ado)\b(?!\s*(?:que|conveniente))',
-            "ARCHIVADO": r'\b(?:archiv(?:ar?|e|ó|ado)|conclus[oa]|inadmit)\b',
-        }
-
-        for categoria, pattern in last_resort_patterns.items():
-            if re.search(pattern, text, re.IGNORECASE):
-                match = re.search(pattern, text, re.IGNORECASE)
+        for categoria, pattern in _LAST_RESORT_PATTERNS.items():
+            match = pattern.search(text)
+            if match:
                 return ClassificationResult(
                     categoria=categoria,
                     confianza="baja",
@@ -378,3 +572,25 @@ class ResolutionClassifier:
             texto_clave="",
             seccion_encontrada=False
         )
+
+
+# Clasificador de cada proceso del pool de classify_many
+_worker_classifier = None
+
+
+def _pool_context():
+    """fork si es seguro (ningún otro hilo en marcha); si no, spawn."""
+    if "fork" in multiprocessing.get_all_start_methods() and threading.active_count() == 1:
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context("spawn")
+
+
+def _init_worker(classifier_cls: type) -> None:
+    """Crea el clasificador del worker (sin cache: classify_many ya deduplica)."""
+    global _worker_classifier
+    _worker_classifier = classifier_cls(cache_size=0)
+
+
+def _classify_in_worker(text: str) -> ClassificationResult:
+    """Clasifica un texto con el clasificador del worker."""
+    return _worker_classifier.classify(text)
@@ -0,0 +1,521 @@
+"""
+Compilación de patrones del clasificador con RE2 opcional.
+
+Con CNMC_USE_RE2=1 y el paquete google-re2 instalado, los patrones se
+compilan con RE2 (autómata de tiempo lineal, sin backtracking). RE2 no
+admite lookarounds, backreferences ni \\b con semántica Unicode, así que
+esos patrones (y cualquiera que RE2 rechace) se compilan con `re`. \\s se
+traduce a la clase explícita de espacios de Python para que ambos motores
+encuentren exactamente las mismas coincidencias; \\w y \\d dependen de la
+versión de Unicode de cada motor y se quedan en `re`.
+
+compile_pattern_set agrupa una lista de patrones en un re2.Set: una sola
+pasada por el texto indica cuáles aparecen, y solo esos se buscan uno a uno.
+Con CNMC_USE_HYPERSCAN=1, compile_hyperscan_prefilter lo hace con una base
+de datos Hyperscan en modo prefiltro. Sin ninguno de los dos,
+compile_literal_prefilter hace lo mismo con el literal obligatorio
+de cada patrón (Aho-Corasick si está pyahocorasick; si no, `in`).
+
+fold_case y lowercase_pattern sustituyen IGNORECASE por una sola pasada de
+lower() sobre el texto y patrones ya en minúsculas.
+"""
+
+import logging
+import re
+from typing import Optional
+
+import sys
+sys.path.insert(0, str(__file__).rsplit("/", 4)[0])
+from config.settings import USE_HYPERSCAN, USE_RE2
+
+try:
+    import re2  # google-re2 (opcional)
+except ImportError:
+    re2 = None
+
+try:
+    import ahocorasick  # pyahocorasick (opcional, extra "fast")
+except ImportError:
+    ahocorasick = None
+
+try:
+    import hyperscan  # hyperscan (opcional, extra "hyperscan")
+except ImportError:
+    hyperscan = None
+
+logger = logging.getLogger(__name__)
+
+# Mismo conjunto que \s de Python (str.isspace)
+_SPACE_CHARS = (
+    r"\t\n\x0b\x0c\r\x1c-\x1f \x{85}\x{a0}\x{1680}\x{2000}-\x{200a}"
+    r"\x{2028}\x{2029}\x{202f}\x{205f}\x{3000}"
+)
+
+# Escapes que se traducen: (dentro de una clase [...], fuera de ella);
+# None = no hay traducción y el patrón se queda en `re`
+_CLASS_ESCAPES = {
+    "s": (_SPACE_CHARS, f"[{_SPACE_CHARS}]"),
+    "S": (None, f"[^{_SPACE_CHARS}]"),
+}
+
+_RE2_FLAGS = ((re.IGNORECASE, "i"), (re.DOTALL, "s"), (re.MULTILINE, "m"))
+
+# Repetición acotada {m}, {m,} o {m,n}
+_RE_REPEAT = re.compile(r"\{(\d+)(?:,(\d*))?\}")
+_RE2_MAX_REPEAT = 1000
+
+# Con IGNORECASE, `re` también empareja "i" con "İ" y "ı"; RE2 no
+_DOTTED_I = "iI\u0130\u0131"
+
+# Caracteres de los literales obligatorios (tras lower()). Para ellos, los
+# únicos que `re` empareja con IGNORECASE y que lower() no convierte en el
+# mismo carácter son "İ", "ı" y "ſ": se traducen antes de buscar
+_LITERAL_CHARS = frozenset("abcdefghijklmnopqrstuvwxyz0123456789áéíóúñü")
+_LITERAL_FOLD = str.maketrans({"\u0130": "i", "\u0131": "i", "\u017f": "s"})
+
+# Longitud mínima de un literal para que merezca la pena como prefiltro
+_MIN_LITERAL_LEN = 3
+
+
+def _to_re2(pattern: str, flags: int) -> Optional[str]:
+    """
+    Traduce un patrón de `re` a sintaxis RE2 con la misma semántica.
+
+    Returns:
+        Patrón RE2 o None si usa construcciones sin equivalente exacto
+    """
+    if flags & ~(re.IGNORECASE | re.DOTALL | re.MULTILINE):
+        return None
+
+    out = []
+    in_class = False
+    i, n = 0, len(pattern)
+
+    while i < n:
+        c = pattern[i]
+
+        if c == "\\":
+            if i + 1 >= n:
+                return None
+            e = pattern[i + 1]
+            i += 2
+            if e in _CLASS_ESCAPES:
+                inside, outside = _CLASS_ESCAPES[e]
+                translated = inside if in_class else outside
+                if translated is None:
+                    return None
+                out.append(translated)
+            elif e == "Z":
+                out.append(r"\z")
+            elif e == "A":
+                out.append(r"\A")
+            elif e == "u" and i + 4 <= n:
+                out.append(rf"\x{{{pattern[i:i + 4]}}}")
+                i += 4
+            elif e.isalnum() and e not in "ntrfvx":
+                # \b, \B, backreferences y escapes sin equivalente
+                return None
+            else:
+                out.append("\\" + e)
+            continue
+
+        if in_class:
+            if c == "]":
+                in_class = False
+                out.append(c)
+                i += 1
+                continue
+            if i + 2 < n and pattern[i + 1] == "-" and pattern[i + 2] != "]":
+                # Rango a-b: con IGNORECASE, si cubre i/I se añaden İ y ı
+                end = pattern[i + 2]
+                if end == "\\" and flags & re.IGNORECASE:
+                    return None
+                out.append(pattern[i:i + 3])
+                if flags & re.IGNORECASE and (c <= "i" <= end or c <= "I" <= end):
+                    out.append(_DOTTED_I[2:])
+                i += 3
+                continue
+            out.append(_DOTTED_I if flags & re.IGNORECASE and c in "iI" else c)
+            i += 1
+            continue
+
+        if flags & re.IGNORECASE and c in "iI":
+            out.append(f"[{_DOTTED_I}]")
+            i += 1
+            continue
+
+        if c == "[":
+            in_class = True
+            out.append(c)
+            i += 1
+            # "^" y un "]" inicial forman parte de la apertura de la clase
+            if i < n and pattern[i] == "^":
+                out.append("^")
+                i += 1
+            if i < n and pattern[i] == "]":
+                out.append(r"\]")
+                i += 1
+            continue
+
+        if c == "(" and pattern.startswith("(?", i):
+            nxt = pattern[i + 2:i + 3]
+            # Lookarounds, backreferences con nombre y comentarios
+            if nxt in ("=", "!", "#") or pattern.startswith(("(?<=", "(?<!", "(?P="), i):
+                return None
+            # Cabecera del grupo ("(?:", "(?P<nombre>", "(?i)") tal cual
+            end = pattern.find(">" if pattern.startswith("(?P<", i) else ":", i)
+            close = pattern.find(")", i)
+            if end == -1 or (close != -1 and close < end):
+                end = close
+            if end == -1:
+                return None
+            out.append(pattern[i:end + 1])
+            i = end + 1
+            continue
+
+        if c == "$" and not flags & re.MULTILINE:
+            # En `re`, $ también coincide antes de un \n final
+            return None
+        elif c == "{" and pattern.startswith("{,", i):
+            return None
+        elif c == "{":
+            # RE2 no admite repeticiones de más de _RE2_MAX_REPEAT
+            repeat = _RE_REPEAT.match(pattern, i)
+            if repeat and any(n and int(n) > _RE2_MAX_REPEAT for n in repeat.groups()):
+                return None
+
+        out.append(c)
+        i += 1
+
+    prefix = "".join(letter for flag, letter in _RE2_FLAGS if flags & flag)
+    return (f"(?{prefix})" if prefix else "") + "".join(out)
+
+
+def compile_pattern(pattern: str, flags: int = 0):
+    """
+    Compila un patrón con RE2 si está activado y es compatible; si no, con `re`.
+
+    Ambos objetos ofrecen search/match/finditer con la misma interfaz.
+
+    Args:
+        pattern: Expresión regular en sintaxis de `re`
+        flags: Flags de `re` (IGNORECASE, DOTALL, MULTILINE)
+
+    Returns:
+        Patrón compilado
+    """
+    if USE_RE2 and re2 is not None:
+        translated = _to_re2(pattern, flags)
+        if translated is not None:
+            try:
+                return re2.compile(translated)
+            except Exception as e:
+                logger.debug(f"RE2 no admite el patrón {pattern!r}: {e}")
+
+    return re.compile(pattern, flags)
+
+
+def fold_case(text: str) -> str:
+    """
+    Pasa el texto a minúsculas conservando la longitud.
+
+    lower() solo alarga "İ" (a "i" + punto combinante); _LITERAL_FOLD la
+    traduce antes, así que las posiciones del resultado valen para el texto
+    original.
+    """
+    # translate recorre el texto en Python carácter a carácter; `in` con un
+    # carácter fuera de Latin-1 es inmediato en textos que solo tienen Latin-1
+    if "\u0130" in text or "\u0131" in text or "\u017f" in text:
+        text = text.translate(_LITERAL_FOLD)
+    return text.lower()
+
+
+def lowercase_pattern(pattern: str) -> str:
+    """
+    Pasa a minúsculas los literales de un patrón sin tocar los escapes.
+
+    Buscar el patrón resultante, sin IGNORECASE, sobre fold_case(texto)
+    equivale a buscar el original con IGNORECASE sobre el texto.
+    """
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        if pattern[i] == "\\":
+            # \S, \W, \A, \Z... cambian de significado en minúsculas
+            out.append(pattern[i:i + 2])
+            i += 2
+            continue
+        out.append(pattern[i].lower())
+        i += 1
+    return "".join(out)
+
+
+class PatternSet:
+    """
+    Prefiltro multi-patrón sobre re2.Set.
+
+    `covered` son los índices (en la lista original) que están en el set; para
+    el resto el set no dice nada y hay que buscarlos igualmente.
+    """
+
+    def __init__(self, re2_set, set_to_index: list[int]):
+        self._set = re2_set
+        self._set_to_index = set_to_index
+        self.covered = frozenset(set_to_index)
+
+    def matching(self, text: str, folded: bool = False) -> frozenset:
+        """Índices de los patrones cubiertos que aparecen en el texto."""
+        hits = self._set.Match(text) or ()
+        return frozenset(self._set_to_index[hit] for hit in hits)
+
+
+def compile_pattern_set(patterns: list[str], flags: int = 0) -> Optional[PatternSet]:
+    """
+    Compila un prefiltro re2.Set con los patrones que RE2 admite.
+
+    Args:
+        patterns: Expresiones regulares en sintaxis de `re`
+        flags: Flags de `re` comunes a todos los patrones
+
+    Returns:
+        PatternSet, o None si RE2 no está activado o no admite ningún patrón
+    """
+    if not USE_RE2 or re2 is None:
+        return None
+
+    re2_set = re2.Set.SearchSet(re2.Options())
+    set_to_index = []
+    for index, pattern in enumerate(patterns):
+        translated = _to_re2(pattern, flags)
+        if translated is None:
+            continue
+        try:
+            re2_set.Add(translated)
+        except Exception as e:
+            logger.debug(f"RE2 no admite el patrón {pattern!r} en el set: {e}")
+            continue
+        set_to_index.append(index)
+
+    if not set_to_index:
+        return None
+
+    re2_set.Compile()
+    return PatternSet(re2_set, set_to_index)
+
+
+class HyperscanPrefilter:
+    """
+    Prefiltro multi-patrón sobre una base de datos Hyperscan, con la interfaz
+    de PatternSet.
+
+    Los patrones se compilan con HS_FLAG_PREFILTER: Hyperscan puede dar
+    coincidencias de más, nunca de menos, así que sirve para descartar.
+    """
+
+    def __init__(self, database, covered: list[int]):
+        self._database = database
+        self.covered = frozenset(covered)
+
+    def matching(self, text: str, folded: bool = False) -> frozenset:
+        """Índices de los patrones cubiertos que pueden aparecer en el texto."""
+        hits = set()
+
+        def on_match(index, start, end, flags, context):
+            hits.add(index)
+
+        self._database.scan(text.encode("utf-8", "replace"), match_event_handler=on_match)
+        return frozenset(hits)
+
+
+def _hyperscan_database(expressions: list[bytes], ids: list[int]):
+    """Compila una base de datos Hyperscan en modo bloque."""
+    flags = (
+        hyperscan.HS_FLAG_UTF8 | hyperscan.HS_FLAG_PREFILTER | hyperscan.HS_FLAG_SINGLEMATCH
+    )
+    database = hyperscan.Database(mode=hyperscan.HS_MODE_BLOCK)
+    database.compile(
+        expressions=expressions,
+        ids=ids,
+        elements=len(expressions),
+        flags=[flags] * len(expressions),
+    )
+    return database
+
+
+def compile_hyperscan_prefilter(
+    patterns: list[str], flags: int = 0
+) -> Optional[HyperscanPrefilter]:
+    """
+    Compila un prefiltro Hyperscan con los patrones que admite.
+
+    Los patrones pasan por la misma traducción que para RE2 (\\s explícito,
+    sin lookarounds ni \\b), que Hyperscan también entiende.
+
+    Args:
+        patterns: Expresiones regulares en sintaxis de `re`
+        flags: Flags de `re` comunes a todos los patrones
+
+    Returns:
+        HyperscanPrefilter, o None si Hyperscan no está activado o no admite
+        ningún patrón
+    """
+    if not USE_HYPERSCAN or hyperscan is None:
+        return None
+
+    expressions = []
+    ids = []
+    for index, pattern in enumerate(patterns):
+        translated = _to_re2(pattern, flags)
+        if translated is None:
+            continue
+        expression = translated.encode("utf-8")
+        # Un patrón no admitido hace fallar la base entera: se prueba uno a uno
+        try:
+            _hyperscan_database([expression], [index])
+        except Exception as e:
+            logger.debug(f"Hyperscan no admite el patrón {pattern!r}: {e}")
+            continue
+        expressions.append(expression)
+        ids.append(index)
+
+    if not ids:
+        return None
+    return HyperscanPrefilter(_hyperscan_database(expressions, ids), ids)
+
+
+def required_literal(pattern: str) -> Optional[str]:
+    """
+    Literal (en minúsculas) que aparece en toda coincidencia del patrón.
+
+    Solo se analiza el nivel superior del patrón: el contenido de grupos y
+    clases, los caracteres con cuantificador ?, * o {} y los escapes cortan
+    el literal. Se devuelve el tramo más largo.
+
+    Returns:
+        Literal obligatorio o None si no hay ninguno fiable
+    """
+    if "(?x" in pattern:
+        return None
+
+    runs = []
+    run = []
+    depth = 0
+    i, n = 0, len(pattern)
+
+    def cut():
+        if run:
+            runs.append("".join(run))
+            run.clear()
+
+    while i < n:
+        c = pattern[i]
+
+        if c == "\\":
+            if i + 1 < n and pattern[i + 1] in "xuUN0123456789":
+                # Escapes de un carácter concreto o backreferences
+                return None
+            cut()
+            i += 2
+            continue
+
+        if c == "[":
+            # Saltar la clase completa ("]" inicial o tras "^" es literal)
+            cut()
+            i += 1
+            if i < n and pattern[i] == "^":
+                i += 1
+            if i < n and pattern[i] == "]":
+                i += 1
+            while i < n and pattern[i] != "]":
+                i += 2 if pattern[i] == "\\" else 1
+            i += 1
+            continue
+
+        if c == "(":
+            cut()
+            depth += 1
+        elif c == ")":
+            cut()
+            depth -= 1
+        elif c == "|":
+            if depth == 0:
+                return None
+            cut()
+        elif c in "?*{":
+            # El carácter anterior es opcional o repetible
+            if depth == 0 and run:
+                run.pop()
+            cut()
+            if c == "{":
+                i = pattern.find("}", i)
+                if i == -1:
+                    return None
+        elif depth == 0 and c.lower() in _LITERAL_CHARS and len(c.lower()) == 1:
+            run.append(c.lower())
+        else:
+            # ".", "+", "^", "$", espacios y signos
+            cut()
+        i += 1
+
+    cut()
+    best = max(runs, key=len, default="")
+    return best if len(best) >= _MIN_LITERAL_LEN else None
+
+
+class LiteralPrefilter:
+    """
+    Prefiltro por literales obligatorios, con la interfaz de PatternSet.
+
+    Si el literal de un patrón no aparece en el texto, el patrón no puede
+    coincidir y no hace falta buscarlo.
+    """
+
+    def __init__(self, literals: dict[str, list[int]]):
+        self._literals = literals
+        self.covered = frozenset(i for indices in literals.values() for i in indices)
+
+        self._automaton = None
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for literal in literals:
+                self._automaton.add_word(literal, literal)
+            self._automaton.make_automaton()
+
+    def matching(self, text: str, folded: bool = False) -> frozenset:
+        """
+        Índices de los patrones cubiertos cuyo literal aparece en el texto.
+
+        Con folded=True el texto ya viene de fold_case y no se repite.
+        """
+        haystack = text if folded else fold_case(text)
+
+        if self._automaton is None:
+            found = [literal for literal in self._literals if literal in haystack]
+        else:
+            found = {literal for _, literal in self._automaton.iter(haystack)}
+
+        return frozenset(i for literal in found for i in self._literals[literal])
+
+
+def compile_literal_prefilter(patterns: list[str]) -> Optional[LiteralPrefilter]:
+    """
+    Prefiltro por literales obligatorios para una lista de patrones.
+
+    Vale con y sin IGNORECASE: el texto y los literales se comparan en
+    minúsculas, así que como mucho deja pasar patrones que luego no coinciden.
+
+    Args:
+        patterns: Expresiones regulares en sintaxis de `re`
+
+    Returns:
+        LiteralPrefilter, o None si ningún patrón tiene literal obligatorio
+    """
+    literals = {}
+    for index, pattern in enumerate(patterns):
+        literal = required_literal(pattern)
+        if literal is not None:
+            literals.setdefault(literal, []).append(index)
+
+    if not literals:
+        return None
+    return LiteralPrefilter(literals)
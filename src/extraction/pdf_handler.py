@@ -2,25 +2,193 @@
 Manejador de PDFs para extraer texto de resoluciones.
 """
 
+import atexit
+import functools
+import hashlib
 import io
 import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
 from typing import Optional
 
 import pdfplumber
 from pypdf import PdfReader
 
+try:
+    from compression import zstd  # Python 3.14+
+except ImportError:
+    try:
+        from backports import zstd  # opcional, extra "fast"
+    except ImportError:
+        zstd = None
+
+try:
+    import pymupdf  # PyMuPDF (opcional, extra "pymupdf")
+except ImportError:
+    pymupdf = None
+
 import sys
 sys.path.insert(0, str(__file__).rsplit("/", 4)[0])
+from config.settings import (
+    PDF_BACKEND,
+    PDF_MAX_PAGES,
+    PDF_PARSE_TIMEOUT,
+    PDF_PARSE_WORKERS,
+    PDF_TEXT_CACHE_DIR,
+    PDF_TEXT_CACHE_ENABLED,
+)
 from src.utils.http_client import CurlClient
 
 logger = logging.getLogger(__name__)
 
+# pdfminer (debajo de pdfplumber) emite mensajes DEBUG/INFO por página y por
+# objeto; aunque el script active DEBUG, de pdfminer solo interesan los avisos
+logging.getLogger("pdfminer").setLevel(logging.WARNING)
+
+# Margen sobre parse_timeout al esperar al pool de procesos: arranque del
+# proceso (spawn vuelve a importar pdfplumber) y la página en curso, porque
+# el propio proceso solo comprueba el límite entre página y página
+PARSE_TIMEOUT_GRACE = 10.0
+
+
+class PDFParseTimeout(Exception):
+    """La extracción de texto de un PDF superó el tiempo máximo."""
+
+
+def _check_deadline(deadline: Optional[float]) -> None:
+    """Lanza PDFParseTimeout si se ha pasado el instante límite (time.monotonic)."""
+    if deadline is not None and time.monotonic() > deadline:
+        raise PDFParseTimeout()
+
+
+def _page_indices(num_pages: int, max_pages: int) -> list[int]:
+    """
+    Índices de las páginas a extraer.
+
+    Con max_pages > 0 y un PDF más largo, las primeras y las últimas páginas
+    (la mitad del límite de cada extremo).
+    """
+    if max_pages <= 0 or num_pages <= max_pages:
+        return list(range(num_pages))
+    head = (max_pages + 1) // 2
+    tail = max_pages - head
+    return list(range(head)) + list(range(num_pages - tail, num_pages))
+
 
 class PDFHandler:
-    """Maneja la descarga y extracción de texto de PDFs."""
+    """
+    Maneja la descarga y extracción de texto de PDFs.
+
+    Con parse_workers > 0 el parseo (CPU, retiene el GIL) se hace en un pool
+    de procesos; los hilos que llaman a extract_text_from_url solo descargan
+    y esperan el resultado.
+
+    backend elige el extractor preciso: "pdfplumber", "pymupdf" (motor en C,
+    bastante más rápido; requiere el paquete pymupdf) o "auto" (pymupdf si
+    está instalado). Si pymupdf no saca texto se prueba con pdfplumber.
+
+    parse_timeout y max_pages acotan el peor caso de un PDF enorme o
+    escaneado: se extraen como mucho max_pages páginas y, pasados
+    parse_timeout segundos, se abandona el PDF (PDFParseTimeout).
+    """
+
+    def __init__(
+        self,
+        client: Optional[CurlClient] = None,
+        use_cache: bool = PDF_TEXT_CACHE_ENABLED,
+        cache_dir: Path = PDF_TEXT_CACHE_DIR,
+        parse_workers: int = PDF_PARSE_WORKERS,
+        backend: str = PDF_BACKEND,
+        parse_timeout: float = PDF_PARSE_TIMEOUT,
+        max_pages: int = PDF_MAX_PAGES,
+    ):
+        if backend == "auto":
+            backend = "pdfplumber" if pymupdf is None else "pymupdf"
+        elif backend == "pymupdf" and pymupdf is None:
+            logger.warning("pymupdf no está instalado, se usa pdfplumber")
+            backend = "pdfplumber"
 
-    def __init__(self, client: Optional[CurlClient] = None):
         self.client = client or CurlClient()
+        self.use_cache = use_cache
+        self.cache_dir = Path(cache_dir)
+        self.parse_workers = parse_workers
+        self.backend = backend
+        self.parse_timeout = parse_timeout
+        self.max_pages = max_pages
+        self._parse_pool = None
+        self._parse_pool_lock = threading.Lock()
+        # Como mucho un trabajo por proceso: un PDF no espera en la cola del
+        # pool, así que el tiempo de espera es todo tiempo de parseo
+        self._parse_slots = threading.BoundedSemaphore(max(1, parse_workers))
+
+    def _cache_path(self, url: str, use_pdfplumber: bool) -> Path:
+        """Ruta del texto cacheado para una URL (el extractor forma parte de la clave)."""
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        if not use_pdfplumber:
+            suffix = ".pypdf.txt"
+        elif self.backend == "pymupdf":
+            suffix = ".pymupdf.txt"
+        else:
+            suffix = ".txt"
+        if self.max_pages > 0:
+            # El texto de un PDF recortado no sirve para el completo (ni al revés)
+            suffix = f".p{self.max_pages}{suffix}"
+        return self.cache_dir / f"{key}{suffix}"
+
+    @staticmethod
+    def _zst_path(path: Path) -> Path:
+        """Ruta de la versión comprimida con zstd de un fichero de cache."""
+        return path.with_name(path.name + ".zst")
+
+    def _read_cache(self, path: Path) -> Optional[str]:
+        """
+        Devuelve el texto cacheado o None si no existe.
+
+        Con zstd disponible se busca primero la versión comprimida (.txt.zst)
+        y después la de texto plano de versiones anteriores.
+        """
+        candidates = [(path, False)]
+        if zstd is not None:
+            candidates.insert(0, (self._zst_path(path), True))
+
+        for candidate, compressed in candidates:
+            try:
+                data = candidate.read_bytes()
+                if compressed:
+                    data = zstd.decompress(data)
+                return data.decode("utf-8")
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                logger.warning(f"No se pudo leer la cache {candidate}: {e}")
+        return None
+
+    def _write_cache(self, path: Path, text: str) -> None:
+        """Escribe el texto (comprimido con zstd si está disponible) de forma atómica."""
+        data = text.encode("utf-8")
+        if zstd is not None:
+            data = zstd.compress(data)
+            path = self._zst_path(path)
+
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            logger.warning(f"No se pudo escribir la cache {path}: {e}")
 
     def download_pdf(self, url: str) -> Optional[bytes]:
         """
@@ -50,7 +218,12 @@ class PDFHandler:
             logger.error(f"Error descargando PDF {url}: {e}")
             return None
 
-    def extract_text_pypdf(self, pdf_content: bytes) -> str:
+    @staticmethod
+    def extract_text_pypdf(
+        pdf_content: bytes,
+        max_pages: int = 0,
+        deadline: Optional[float] = None,
+    ) -> str:
         """
         Extrae texto de un PDF usando pypdf (más rápido, menos preciso).
         """
@@ -58,79 +231,271 @@ class PDFHandler:
             reader = PdfReader(io.BytesIO(pdf_content))
             text_parts = []
 
-            for page in reader.pages:
-                text = page.extract_text()
+            for i in _page_indices(len(reader.pages), max_pages):
+                _check_deadline(deadline)
+                text = reader.pages[i].extract_text()
                 if text:
                     text_parts.append(text)
 
             return "\n".join(text_parts)
 
+        except PDFParseTimeout:
+            raise
         except Exception as e:
             logger.error(f"Error extrayendo texto con pypdf: {e}")
             return ""
 
-    def extract_text_pdfplumber(self, pdf_content: bytes) -> str:
+    @staticmethod
+    def extract_text_pdfplumber(
+        pdf_content: bytes,
+        max_pages: int = 0,
+        deadline: Optional[float] = None,
+    ) -> str:
         """
         Extrae texto de un PDF usando pdfplumber (más lento, más preciso).
         """
         try:
             with pdfplumber.open(io.BytesIO(pdf_content)) as pdf:
                 text_parts = []
-
-                for page in pdf.pages:
-                    text = page.extract_text()
+                pages = pdf.pages
+
+                for i in _page_indices(len(pages), max_pages):
+                    _check_deadline(deadline)
+                    page = pages[i]
+                    try:
+                        text = page.extract_text()
+                    finally:
+                        # Libera los caracteres y objetos de layout cacheados
+                        # de la página: si no, se acumulan hasta cerrar el PDF
+                        page.close()
                     if text:
                         text_parts.append(text)
 
                 return "\n".join(text_parts)
 
+        except PDFParseTimeout:
+            raise
         except Exception as e:
             logger.error(f"Error extrayendo texto con pdfplumber: {e}")
             return ""
 
-    def extract_text(self, pdf_content: bytes, use_pdfplumber: bool = True) -> str:
+    @staticmethod
+    def extract_text_pymupdf(
+        pdf_content: bytes,
+        max_pages: int = 0,
+        deadline: Optional[float] = None,
+    ) -> str:
+        """
+        Extrae texto de un PDF usando PyMuPDF (rápido y preciso).
+        """
+        try:
+            with pymupdf.open(stream=pdf_content, filetype="pdf") as doc:
+                text_parts = []
+
+                for i in _page_indices(len(doc), max_pages):
+                    _check_deadline(deadline)
+                    text = doc[i].get_text("text")
+                    if text:
+                        text_parts.append(text)
+
+                return "\n".join(text_parts)
+
+        except PDFParseTimeout:
+            raise
+        except Exception as e:
+            logger.error(f"Error extrayendo texto con pymupdf: {e}")
+            return ""
+
+    @staticmethod
+    def extract_text(
+        pdf_content: bytes,
+        use_pdfplumber: bool = True,
+        backend: str = "pdfplumber",
+        max_pages: int = 0,
+        timeout: float = 0,
+    ) -> str:
         """
         Extrae texto de un PDF.
 
         Args:
             pdf_content: Contenido del PDF en bytes
-            use_pdfplumber: Si True, usa pdfplumber (más preciso pero lento)
+            use_pdfplumber: Si True, usa el extractor preciso (más lento que pypdf)
+            backend: Extractor preciso: "pdfplumber" o "pymupdf"
+            max_pages: Páginas máximas a extraer (0 = todas)
+            timeout: Segundos máximos para toda la extracción (0 = sin límite);
+                se comprueba entre página y página
 
         Returns:
             Texto extraído
+
+        Raises:
+            PDFParseTimeout: Si se supera el timeout
         """
+        deadline = time.monotonic() + timeout if timeout > 0 else None
+
         if use_pdfplumber:
-            text = self.extract_text_pdfplumber(pdf_content)
+            text = ""
+            if backend == "pymupdf" and pymupdf is not None:
+                text = PDFHandler.extract_text_pymupdf(pdf_content, max_pages, deadline)
+            if not text:
+                text = PDFHandler.extract_text_pdfplumber(pdf_content, max_pages, deadline)
             if not text:
-                text = self.extract_text_pypdf(pdf_content)
+                text = PDFHandler.extract_text_pypdf(pdf_content, max_pages, deadline)
         else:
-            text = self.extract_text_pypdf(pdf_content)
+            text = PDFHandler.extract_text_pypdf(pdf_content, max_pages, deadline)
 
         return text
 
+    def _get_parse_pool(self) -> ProcessPoolExecutor:
+        """Crea el pool de procesos de parseo la primera vez que se necesita."""
+        with self._parse_pool_lock:
+            if self._parse_pool is None:
+                # spawn: hacer fork de un proceso con hilos de descarga no es seguro
+                self._parse_pool = ProcessPoolExecutor(
+                    max_workers=self.parse_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._parse_pool
+
+    def _kill_parse_pool(self, pool: ProcessPoolExecutor) -> None:
+        """
+        Mata los procesos de un pool y lo descarta (se crea otro al necesitarlo).
+
+        Es la única forma de parar un trabajo en marcha: future.cancel() no
+        detiene uno que ya ha empezado y el proceso quedaría ocupado para
+        siempre. Los trabajos de otros hilos en ese pool reciben
+        BrokenProcessPool y se reintentan en el pool nuevo (ver _parse).
+        """
+        with self._parse_pool_lock:
+            if self._parse_pool is pool:
+                self._parse_pool = None
+
+        kill_workers = getattr(pool, "kill_workers", None)  # Python 3.14+
+        if kill_workers is not None:
+            kill_workers()
+        else:
+            for process in list((pool._processes or {}).values()):
+                process.kill()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _parse_in_pool(self, args: tuple) -> str:
+        """
+        Extrae el texto en el pool de procesos.
+
+        Raises:
+            PDFParseTimeout: Si la extracción supera parse_timeout
+            BrokenProcessPool: Si el pool deja de funcionar
+        """
+        timeout = self.parse_timeout + PARSE_TIMEOUT_GRACE if self.parse_timeout > 0 else None
+        while True:
+            with self._parse_slots:
+                pool = self._get_parse_pool()
+                future = pool.submit(PDFHandler.extract_text, *args)
+                try:
+                    # El proceso también se corta solo entre páginas; esta
+                    # espera cubre una única página que no termina
+                    return future.result(timeout=timeout)
+                except FutureTimeoutError:
+                    self._kill_parse_pool(pool)
+                    raise PDFParseTimeout()
+                except BrokenProcessPool:
+                    with self._parse_pool_lock:
+                        replaced = self._parse_pool is not pool
+                    if not replaced:
+                        raise
+                    # Otro hilo mató el pool por un PDF atascado: este PDF no
+                    # tiene la culpa y se vuelve a lanzar en el pool nuevo
+
+    def _parse(self, pdf_content: bytes, use_pdfplumber: bool) -> str:
+        """
+        Extrae el texto en el pool de procesos si está activo; si no, en este hilo.
+
+        Raises:
+            PDFParseTimeout: Si la extracción supera parse_timeout
+        """
+        args = (pdf_content, use_pdfplumber, self.backend, self.max_pages, self.parse_timeout)
+        if self.parse_workers > 0:
+            try:
+                return self._parse_in_pool(args)
+            except PDFParseTimeout:
+                raise
+            except Exception as e:
+                # Los errores de un PDF concreto ya los captura extract_text:
+                # esto es el pool roto, así que se deja de usar
+                logger.error(f"Pool de parseo no disponible, se parsea en los hilos: {e}")
+                self.parse_workers = 0
+        return self.extract_text(*args)
+
     def extract_text_from_url(self, url: str, use_pdfplumber: bool = True) -> Optional[str]:
         """
         Descarga un PDF y extrae su texto.
 
+        Si use_cache, el texto se guarda en disco y las siguientes llamadas con
+        la misma URL no descargan ni parsean el PDF.
+
         Args:
             url: URL del PDF
             use_pdfplumber: Si True, usa pdfplumber para extracción
 
         Returns:
             Texto extraído o None si falla
+
+        Raises:
+            PDFParseTimeout: Si la extracción supera parse_timeout (no se cachea)
         """
+        cache_path = self._cache_path(url, use_pdfplumber) if self.use_cache else None
+        if cache_path is not None:
+            text = self._read_cache(cache_path)
+            if text is not None:
+                logger.debug(f"Texto de PDF desde cache: {url}")
+                return text
+
         pdf_content = self.download_pdf(url)
         if not pdf_content:
             return None
 
-        return self.extract_text(pdf_content, use_pdfplumber)
+        try:
+            text = self._parse(pdf_content, use_pdfplumber)
+        except PDFParseTimeout:
+            logger.warning(f"Extracción de texto abandonada tras {self.parse_timeout:g} s: {url}")
+            raise
+
+        # Solo se cachean extracciones con texto (los fallos se reintentan)
+        if cache_path is not None and text:
+            self._write_cache(cache_path, text)
+
+        return text
 
     def close(self):
-        """Cierra el cliente."""
+        """Cierra el cliente y el pool de parseo."""
         self.client.close()
+        with self._parse_pool_lock:
+            if self._parse_pool is not None:
+                self._parse_pool.shutdown()
+                self._parse_pool = None
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.close()
+
+
+@functools.lru_cache(maxsize=None)
+def _shared_pdf_handler(use_cache: bool, parse_workers: int) -> PDFHandler:
+    handler = PDFHandler(use_cache=use_cache, parse_workers=parse_workers)
+    atexit.register(handler.close)
+    return handler
+
+
+def get_pdf_handler(
+    use_cache: bool = PDF_TEXT_CACHE_ENABLED,
+    parse_workers: int = PDF_PARSE_WORKERS,
+) -> PDFHandler:
+    """
+    PDFHandler compartido por proceso (uno por combinación de argumentos).
+
+    Todos los llamadores comparten el mismo cliente HTTP y, con él, el rate
+    limit y el límite de concurrencia por host. Se cierra al salir.
+    """
+    return _shared_pdf_handler(bool(use_cache), max(0, int(parse_workers)))
@@ -22,6 +22,36 @@ logger = logging.getLogger(__name__)
 # idtipoexp=6062 -> Conflictos de acceso - Energía
 EXPEDIENTES_URL = "https://www.cnmc.es/va/expedientes"
 
+# Formatos: "01 Apr 2014", "15/03/2024", "2024-03-15"
+_DATE_FORMATS = (
+    "%d %b %Y",      # 01 Apr 2014
+    "%d %B %Y",      # 01 April 2014
+    "%d/%m/%Y",      # 15/03/2024
+    "%Y-%m-%d",      # 2024-03-15
+)
+
+# Mapeo de meses en español/valenciano (compilados una vez, en orden)
+_MONTH_MAP = {
+    "ene": "Jan", "feb": "Feb", "mar": "Mar", "abr": "Apr",
+    "may": "May", "jun": "Jun", "jul": "Jul", "ago": "Aug",
+    "sep": "Sep", "oct": "Oct", "nov": "Nov", "dic": "Dec",
+    "gen": "Jan", "abril": "Apr", "maig": "May", "juny": "Jun",
+    "juliol": "Jul", "agost": "Aug", "setembre": "Sep",
+    "octubre": "Oct", "novembre": "Nov", "desembre": "Dec",
+}
+_MONTH_RES = tuple(
+    (es, re.compile(es, re.IGNORECASE), en) for es, en in _MONTH_MAP.items()
+)
+
+_RE_PAGE = re.compile(r"page=(\d+)")
+_RE_PDF_HREF = re.compile(r"\.pdf$", re.I)
+
+# Campos adicionales de la ficha del expediente
+_DETAIL_FIELD_RES = tuple(
+    (field_name, re.compile(f"page-nw-proceedings-{field_name}"))
+    for field_name in ("fecha", "tipo", "estado", "sector", "ambito")
+)
+
 
 class CNMCScraper:
     """Scraper para extraer expedientes de la CNMC."""
@@ -69,32 +99,14 @@ class CNMCScraper:
 
         date_str = date_str.strip()
 
-        # Formatos: "01 Apr 2014", "15/03/2024", "2024-03-15"
-        formats = [
-            "%d %b %Y",      # 01 Apr 2014
-            "%d %B %Y",      # 01 April 2014
-            "%d/%m/%Y",      # 15/03/2024
-            "%Y-%m-%d",      # 2024-03-15
-        ]
-
-        # Mapeo de meses en español/valenciano
-        month_map = {
-            "ene": "Jan", "feb": "Feb", "mar": "Mar", "abr": "Apr",
-            "may": "May", "jun": "Jun", "jul": "Jul", "ago": "Aug",
-            "sep": "Sep", "oct": "Oct", "nov": "Nov", "dic": "Dec",
-            "gen": "Jan", "abril": "Apr", "maig": "May", "juny": "Jun",
-            "juliol": "Jul", "agost": "Aug", "setembre": "Sep",
-            "octubre": "Oct", "novembre": "Nov", "desembre": "Dec",
-        }
-
         # Normalizar meses
         date_lower = date_str.lower()
-        for es, en in month_map.items():
+        for es, month_re, en in _MONTH_RES:
             if es in date_lower:
-                date_str = re.sub(es, en, date_str, flags=re.IGNORECASE)
+                date_str = month_re.sub(en, date_str)
                 break
 
-        for fmt in formats:
+        for fmt in _DATE_FORMATS:
             try:
                 return datetime.strptime(date_str, fmt).date()
             except ValueError:
@@ -204,7 +216,7 @@ class CNMCScraper:
             max_page = 0
             for link in page_links:
                 href = link.get("href", "")
-                match = re.search(r"page=(\d+)", href)
+                match = _RE_PAGE.search(href)
                 if match:
                     max_page = max(max_page, int(match.group(1)))
             return max_page + 1  # Las páginas empiezan en 0
@@ -324,7 +336,7 @@ class CNMCScraper:
         details = {}
 
         # Buscar enlaces a PDFs
-        pdf_links = soup.find_all("a", href=re.compile(r"\.pdf$", re.I))
+        pdf_links = soup.find_all("a", href=_RE_PDF_HREF)
 
         resolution_urls = []
         for link in pdf_links:
@@ -342,8 +354,8 @@ class CNMCScraper:
         details["url_resolucion"] = resolution_urls[0] if resolution_urls else None
 
         # Extraer campos adicionales
-        for field_name in ["fecha", "tipo", "estado", "sector", "ambito"]:
-            elem = soup.find(class_=re.compile(f"page-nw-proceedings-{field_name}"))
+        for field_name, field_re in _DETAIL_FIELD_RES:
+            elem = soup.find(class_=field_re)
             if elem:
                 details[field_name] = elem.get_text(strip=True)
 
@@ -31,6 +31,7 @@ def generate_pie_chart(
     expedientes: list[Expediente],
     output_path: Optional[Path] = None,
     filename: str = "distribucion_resultados.png",
+    df: Optional[pd.DataFrame] = None,
 ) -> Path:
     """
     Genera un gráfico circular de distribución de resultados.
@@ -39,6 +40,8 @@ def generate_pie_chart(
         expedientes: Lista de expedientes
         output_path: Directorio de salida
         filename: Nombre del archivo
+        df: DataFrame de expedientes_to_dataframe ya construido (opcional,
+            para reutilizarlo entre informes)
 
     Returns:
         Path del archivo generado
@@ -48,7 +51,8 @@ def generate_pie_chart(
 
     filepath = output_dir / filename
 
-    df = expedientes_to_dataframe(expedientes)
+    if df is None:
+        df = expedientes_to_dataframe(expedientes)
     counts = df["Resultado_clasificado"].value_counts()
 
     # Preparar colores
@@ -91,6 +95,7 @@ def generate_bar_chart(
     expedientes: list[Expediente],
     output_path: Optional[Path] = None,
     filename: str = "barras_resultados.png",
+    df: Optional[pd.DataFrame] = None,
 ) -> Path:
     """
     Genera un gráfico de barras de resultados.
@@ -99,6 +104,8 @@ def generate_bar_chart(
         expedientes: Lista de expedientes
         output_path: Directorio de salida
         filename: Nombre del archivo
+        df: DataFrame de expedientes_to_dataframe ya construido (opcional,
+            para reutilizarlo entre informes)
 
     Returns:
         Path del archivo generado
@@ -108,7 +115,8 @@ def generate_bar_chart(
 
     filepath = output_dir / filename
 
-    df = expedientes_to_dataframe(expedientes)
+    if df is None:
+        df = expedientes_to_dataframe(expedientes)
     counts = df["Resultado_clasificado"].value_counts()
 
     # Preparar colores
@@ -153,6 +161,7 @@ def generate_timeline_chart(
     expedientes: list[Expediente],
     output_path: Optional[Path] = None,
     filename: str = "timeline_resultados.png",
+    df: Optional[pd.DataFrame] = None,
 ) -> Path:
     """
     Genera un gráfico de línea temporal de resoluciones.
@@ -161,6 +170,8 @@ def generate_timeline_chart(
         expedientes: Lista de expedientes
         output_path: Directorio de salida
         filename: Nombre del archivo
+        df: DataFrame de expedientes_to_dataframe ya construido (opcional,
+            para reutilizarlo entre informes)
 
     Returns:
         Path del archivo generado
@@ -170,7 +181,8 @@ def generate_timeline_chart(
 
     filepath = output_dir / filename
 
-    df = expedientes_to_dataframe(expedientes)
+    if df is None:
+        df = expedientes_to_dataframe(expedientes)
 
     # Filtrar solo los que tienen fecha
     df = df[df["Fecha"].notna()].copy()
@@ -216,6 +228,7 @@ def generate_timeline_chart(
 def generate_all_charts(
     expedientes: list[Expediente],
     output_path: Optional[Path] = None,
+    df: Optional[pd.DataFrame] = None,
 ) -> list[Path]:
     """
     Genera todos los gráficos disponibles.
@@ -223,14 +236,20 @@ def generate_all_charts(
     Args:
         expedientes: Lista de expedientes
         output_path: Directorio de salida
+        df: DataFrame de expedientes_to_dataframe ya construido (opcional,
+            para reutilizarlo entre informes)
 
     Returns:
         Lista de paths de archivos generados
     """
     paths = []
 
-    paths.append(generate_pie_chart(expedientes, output_path))
-    paths.append(generate_bar_chart(expedientes, output_path))
-    paths.append(generate_timeline_chart(expedientes, output_path))
+    # Un solo DataFrame para los tres gráficos
+    if df is None:
+        df = expedientes_to_dataframe(expedientes)
+
+    paths.append(generate_pie_chart(expedientes, output_path, df=df))
+    paths.append(generate_bar_chart(expedientes, output_path, df=df))
+    paths.append(generate_timeline_chart(expedientes, output_path, df=df))
 
     return paths
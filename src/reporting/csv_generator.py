@@ -4,6 +4,7 @@ Generador de informes CSV.
 
 import csv
 import logging
+from collections import Counter
 from pathlib import Path
 from typing import Optional
 
@@ -27,9 +28,8 @@ def expedientes_to_dataframe(expedientes: list[Expediente]) -> pd.DataFrame:
     Returns:
         DataFrame con los datos
     """
-    data = []
-    for exp in expedientes:
-        data.append({
+    data = [
+        {
             "ID_expediente": exp.id,
             "Titulo": exp.titulo,
             "Fecha": exp.fecha,
@@ -39,10 +39,13 @@ def expedientes_to_dataframe(expedientes: list[Expediente]) -> pd.DataFrame:
             "Estado": exp.estado,
             "Ultimo_resultado_web": exp.ultimo_resultado,
             "Resultado_clasificado": exp.resultado_clasificado or "NO_CLASIFICADO",
-            "Keywords_encontradas": "; ".join(exp.keywords_encontradas),
+            # dict.fromkeys: sin duplicados y conservando el orden de aparición
+            "Keywords_encontradas": "; ".join(dict.fromkeys(exp.keywords_encontradas)),
             "URL_expediente": exp.url,
             "URL_resolucion": exp.url_resolucion or "",
-        })
+        }
+        for exp in expedientes
+    ]
 
     return pd.DataFrame(data)
 
@@ -51,6 +54,7 @@ def generate_csv(
     expedientes: list[Expediente],
     output_path: Optional[Path] = None,
     filename: str = "expedientes_cnmc.csv",
+    df: Optional[pd.DataFrame] = None,
 ) -> Path:
     """
     Genera un archivo CSV con los expedientes.
@@ -59,6 +63,8 @@ def generate_csv(
         expedientes: Lista de expedientes
         output_path: Directorio de salida (por defecto OUTPUT_DIR)
         filename: Nombre del archivo
+        df: DataFrame de expedientes_to_dataframe ya construido (opcional,
+            para reutilizarlo entre informes)
 
     Returns:
         Path del archivo generado
@@ -68,7 +74,8 @@ def generate_csv(
 
     filepath = output_dir / filename
 
-    df = expedientes_to_dataframe(expedientes)
+    if df is None:
+        df = expedientes_to_dataframe(expedientes)
     df.to_csv(filepath, index=False, encoding="utf-8-sig")
 
     logger.info(f"CSV generado: {filepath} ({len(expedientes)} registros)")
@@ -96,32 +103,41 @@ def generate_summary_csv(
 
     filepath = output_dir / filename
 
-    # Calcular estadísticas
-    df = expedientes_to_dataframe(expedientes)
-    total = len(df)
-
-    summary_data = []
-    for resultado in df["Resultado_clasificado"].unique():
-        count = len(df[df["Resultado_clasificado"] == resultado])
-        percentage = (count / total * 100) if total > 0 else 0
-        summary_data.append({
-            "Resultado": resultado,
-            "Cantidad": count,
-            "Porcentaje": f"{percentage:.1f}%",
-        })
-
-    # Ordenar por cantidad descendente
-    summary_data.sort(key=lambda x: x["Cantidad"], reverse=True)
-
-    # Añadir total
-    summary_data.append({
-        "Resultado": "TOTAL",
-        "Cantidad": total,
-        "Porcentaje": "100%",
-    })
-
-    summary_df = pd.DataFrame(summary_data)
-    summary_df.to_csv(filepath, index=False, encoding="utf-8-sig")
+    # Conteo en una pasada (Counter conserva el orden de primera aparición)
+    counts = Counter(exp.resultado_clasificado or "NO_CLASIFICADO" for exp in expedientes)
+    write_summary_csv(counts, filepath, encoding="utf-8-sig")
 
     logger.info(f"Resumen CSV generado: {filepath}")
     return filepath
+
+
+def write_summary_csv(
+    counts: Counter,
+    filepath: Path,
+    encoding: str = "utf-8",
+) -> Path:
+    """
+    Escribe la tabla Resultado,Cantidad,Porcentaje con una fila TOTAL al final.
+
+    Las filas van de mayor a menor cantidad; en los empates se mantiene el
+    orden de `counts`.
+
+    Args:
+        counts: Cantidad por resultado
+        filepath: Ruta del CSV
+        encoding: Codificación ("utf-8-sig" para que Excel detecte UTF-8)
+
+    Returns:
+        Path del archivo generado
+    """
+    total = sum(counts.values())
+
+    with open(filepath, "w", encoding=encoding, newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(["Resultado", "Cantidad", "Porcentaje"])
+        for resultado, count in counts.most_common():
+            pct = count / total * 100 if total > 0 else 0
+            writer.writerow([resultado, count, f"{pct:.1f}%"])
+        writer.writerow(["TOTAL", total, "100%"])
+
+    return filepath
@@ -9,6 +9,7 @@ from typing import Optional
 import pandas as pd
 from openpyxl import Workbook
 from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+from openpyxl.utils import get_column_letter
 from openpyxl.utils.dataframe import dataframe_to_rows
 from openpyxl.chart import PieChart, BarChart, Reference
 
@@ -25,6 +26,7 @@ def generate_excel_report(
     expedientes: list[Expediente],
     output_path: Optional[Path] = None,
     filename: str = "informe_cnmc.xlsx",
+    df: Optional[pd.DataFrame] = None,
 ) -> Path:
     """
     Genera un informe Excel completo con datos y estadísticas.
@@ -33,6 +35,8 @@ def generate_excel_report(
         expedientes: Lista de expedientes
         output_path: Directorio de salida
         filename: Nombre del archivo
+        df: DataFrame de expedientes_to_dataframe ya construido (opcional,
+            para reutilizarlo entre informes)
 
     Returns:
         Path del archivo generado
@@ -49,31 +53,27 @@ def generate_excel_report(
     ws_data = wb.active
     ws_data.title = "Expedientes"
 
-    df = expedientes_to_dataframe(expedientes)
+    if df is None:
+        df = expedientes_to_dataframe(expedientes)
 
-    # Escribir datos
-    for r_idx, row in enumerate(dataframe_to_rows(df, index=False, header=True), 1):
-        for c_idx, value in enumerate(row, 1):
-            cell = ws_data.cell(row=r_idx, column=c_idx, value=value)
+    # Escribir datos fila a fila (append) y calcular a la vez el ancho de
+    # cada columna, sin volver a recorrer las celdas
+    max_lengths = [0] * len(df.columns)
+    for row in dataframe_to_rows(df, index=False, header=True):
+        ws_data.append(row)
+        for c_idx, value in enumerate(row):
+            max_lengths[c_idx] = max(max_lengths[c_idx], len(str(value)))
 
-            # Formato para cabecera
-            if r_idx == 1:
-                cell.font = Font(bold=True, color="FFFFFF")
-                cell.fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-                cell.alignment = Alignment(horizontal="center")
+    # Formato para cabecera
+    for cell in ws_data[1]:
+        cell.font = Font(bold=True, color="FFFFFF")
+        cell.fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
+        cell.alignment = Alignment(horizontal="center")
 
     # Ajustar anchos de columna
-    for column in ws_data.columns:
-        max_length = 0
-        column_letter = column[0].column_letter
-        for cell in column:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
+    for c_idx, max_length in enumerate(max_lengths, 1):
         adjusted_width = min(max_length + 2, 50)
-        ws_data.column_dimensions[column_letter].width = adjusted_width
+        ws_data.column_dimensions[get_column_letter(c_idx)].width = adjusted_width
 
     # Hoja 2: Resumen estadístico
     ws_stats = wb.create_sheet("Estadísticas")
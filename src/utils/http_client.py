@@ -2,41 +2,131 @@
 Cliente HTTP usando curl (requests está bloqueado por la CNMC).
 """
 
+import functools
+import random
 import subprocess
+import threading
 import time
 import logging
 import shutil
 from typing import Optional
+from urllib.parse import urlsplit
 
 import sys
 sys.path.insert(0, str(__file__).rsplit("/", 3)[0])
-from config.settings import REQUEST_TIMEOUT, REQUEST_DELAY
+from config.settings import (
+    HTTP_PER_HOST_CONCURRENCY,
+    POLITE_DELAY_JITTER,
+    REQUEST_DELAY,
+    REQUEST_TIMEOUT,
+)
 
 logger = logging.getLogger(__name__)
 
 
-class CurlClient:
-    """Cliente HTTP basado en curl para evitar bloqueos anti-bot."""
+class _HostLimiter:
+    """Límite de concurrencia y rate limit de un host, compartido entre clientes."""
+
+    def __init__(self, max_concurrency: int):
+        self.last_request_time = 0.0
+        self.next_slot = 0.0
+        self.lock = threading.Lock()
+        self.semaphore = threading.BoundedSemaphore(max_concurrency)
+
+
+# Un limitador por (host, delay, max_concurrency) para todo el proceso: el
+# scraper, PDFHandler y cualquier otro cliente contra cnmc.es comparten los
+# mismos huecos, así que el límite por host se cumple aunque haya varios clientes
+_HOST_LIMITERS: dict[tuple, _HostLimiter] = {}
+_HOST_LIMITERS_LOCK = threading.Lock()
+
+
+def _host_limiter(url: str, delay: float, max_concurrency: int) -> _HostLimiter:
+    """Limitador compartido del host de la URL (se crea la primera vez)."""
+    key = (urlsplit(url).hostname or "", delay, max_concurrency)
+    with _HOST_LIMITERS_LOCK:
+        limiter = _HOST_LIMITERS.get(key)
+        if limiter is None:
+            limiter = _HOST_LIMITERS[key] = _HostLimiter(max_concurrency)
+        return limiter
+
+
+def _throttled(method):
+    """Aplica el límite de concurrencia por host y el rate limit a una petición."""
+    @functools.wraps(method)
+    def wrapper(self, url):
+        limiter = _host_limiter(url, self.delay, self.max_concurrency)
+        with limiter.semaphore:
+            self._wait_for_rate_limit(limiter)
+            try:
+                return method(self, url)
+            finally:
+                limiter.last_request_time = time.time()
+    return wrapper
+
+
+class BaseHTTPClient:
+    """
+    Base común: timeout, rate limit y protocolo de context manager.
+
+    El límite es por host y compartido por todos los clientes del proceso
+    con la misma configuración (y seguro entre hilos): contra un mismo host,
+    como mucho `max_concurrency` peticiones simultáneas, con sus inicios
+    espaciados `delay` segundos (+ jitter aleatorio).
+    """
 
     def __init__(
         self,
         timeout: int = REQUEST_TIMEOUT,
         delay: float = REQUEST_DELAY,
+        max_concurrency: int = HTTP_PER_HOST_CONCURRENCY,
+        jitter: float = POLITE_DELAY_JITTER,
     ):
         self.timeout = timeout
         self.delay = delay
-        self.last_request_time = 0.0
+        self.jitter = jitter
+        self.max_concurrency = max_concurrency
+
+    def _wait_for_rate_limit(self, limiter: _HostLimiter):
+        """Reserva el siguiente hueco del rate limit del host y espera hasta él."""
+        with limiter.lock:
+            now = time.time()
+            slot = max(now, limiter.last_request_time + self.delay, limiter.next_slot)
+            limiter.next_slot = slot + self.delay
+
+        wait = slot - now
+        if self.delay and self.jitter:
+            wait += random.uniform(0, self.jitter)
+        if wait > 0:
+            time.sleep(wait)
+
+    def close(self):
+        """No-op para compatibilidad."""
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+class CurlClient(BaseHTTPClient):
+    """Cliente HTTP basado en curl para evitar bloqueos anti-bot."""
+
+    def __init__(
+        self,
+        timeout: int = REQUEST_TIMEOUT,
+        delay: float = REQUEST_DELAY,
+        max_concurrency: int = HTTP_PER_HOST_CONCURRENCY,
+    ):
+        super().__init__(timeout=timeout, delay=delay, max_concurrency=max_concurrency)
 
         # Verificar que curl está disponible
         if not shutil.which("curl"):
             raise RuntimeError("curl no está instalado en el sistema")
 
-    def _wait_for_rate_limit(self):
-        """Espera si es necesario para respetar el rate limit."""
-        elapsed = time.time() - self.last_request_time
-        if elapsed < self.delay:
-            time.sleep(self.delay - elapsed)
-
+    @_throttled
     def get(self, url: str) -> Optional[str]:
         """
         Realiza una petición GET con curl.
@@ -47,12 +137,11 @@ class CurlClient:
         Returns:
             Contenido HTML o None si falla
         """
-        self._wait_for_rate_limit()
-
         cmd = [
             "curl",
             "-s",  # Silent
             "-L",  # Follow redirects
+            "--compressed",  # Negociar zstd/br/gzip y descomprimir
             "-A", "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
             "-H", "Accept: text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
             "-H", "Accept-Language: es-ES,es;q=0.9",
@@ -64,7 +153,6 @@ class CurlClient:
 
         try:
             result = subprocess.run(cmd, capture_output=True, text=True, timeout=self.timeout + 5)
-            self.last_request_time = time.time()
 
             if result.returncode != 0:
                 logger.error(f"curl falló con código {result.returncode}: {result.stderr}")
@@ -79,6 +167,7 @@ class CurlClient:
             logger.error(f"Error en GET {url}: {e}")
             return None
 
+    @_throttled
     def get_binary(self, url: str) -> Optional[bytes]:
         """
         Descarga contenido binario (PDFs, imágenes).
@@ -89,12 +178,11 @@ class CurlClient:
         Returns:
             Contenido en bytes o None si falla
         """
-        self._wait_for_rate_limit()
-
         cmd = [
             "curl",
             "-s",
             "-L",
+            "--compressed",
             "-A", "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
             "--max-time", str(self.timeout),
             url,
@@ -104,7 +192,6 @@ class CurlClient:
 
         try:
             result = subprocess.run(cmd, capture_output=True, timeout=self.timeout + 5)
-            self.last_request_time = time.time()
 
             if result.returncode != 0:
                 logger.error(f"curl falló con código {result.returncode}")
@@ -119,16 +206,6 @@ class CurlClient:
             logger.error(f"Error en GET {url}: {e}")
             return None
 
-    def close(self):
-        """No-op para compatibilidad."""
-        pass
-
-    def __enter__(self):
-        return self
-
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        pass
-
 
 # Alias para compatibilidad
 HTTPClient = CurlClient
@@ -0,0 +1,135 @@
+"""
+Lectura y escritura de los JSON de expedientes.
+
+Usa orjson si está instalado (extra "fast"); si no, el módulo json estándar.
+El formato de salida es el mismo en ambos casos: UTF-8 sin escapar e
+indentación de 2 espacios (una línea por objeto en los JSONL).
+
+Las rutas terminadas en .zst se leen y escriben comprimidas con zstd
+(compression.zstd en Python 3.14+, backports.zstd del extra "fast" antes).
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Union
+
+try:
+    import orjson  # opcional, extra "fast"
+except ImportError:
+    orjson = None
+
+try:
+    from compression import zstd  # Python 3.14+
+except ImportError:
+    try:
+        from backports import zstd  # opcional, extra "fast"
+    except ImportError:
+        zstd = None
+
+
+def _is_zst(path: Path) -> bool:
+    """Indica si la ruta es un JSON comprimido (.zst); exige zstd."""
+    if path.suffix != ".zst":
+        return False
+    if zstd is None:
+        raise RuntimeError(f"Hace falta zstd (extra \"fast\") para leer o escribir {path}")
+    return True
+
+
+def load_json(path: Union[str, Path]) -> Any:
+    """
+    Carga un fichero JSON completo.
+
+    Args:
+        path: Ruta del fichero
+
+    Returns:
+        Objeto deserializado
+    """
+    path = Path(path)
+    if _is_zst(path):
+        data = zstd.decompress(path.read_bytes())
+        return orjson.loads(data) if orjson is not None else json.loads(data)
+
+    if orjson is not None:
+        with open(path, "rb") as f:
+            return orjson.loads(f.read())
+
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def dump_json(data: Any, path: Union[str, Path]) -> None:
+    """
+    Guarda un objeto como JSON indentado.
+
+    Se escribe en un temporal junto al destino y se renombra (os.replace), de
+    modo que una interrupción nunca deja el fichero a medio escribir.
+
+    Args:
+        data: Objeto serializable
+        path: Ruta del fichero
+    """
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+
+    try:
+        if _is_zst(path):
+            if orjson is not None:
+                raw = orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+            else:
+                raw = json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+            with open(tmp_path, "wb") as f:
+                f.write(zstd.compress(raw))
+        elif orjson is not None:
+            with open(tmp_path, "wb") as f:
+                f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+        else:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def jsonl_line(obj: Any) -> bytes:
+    """
+    Serializa un objeto como una línea JSONL (terminada en salto de línea).
+
+    Args:
+        obj: Objeto serializable
+
+    Returns:
+        Línea codificada en UTF-8
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE)
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+def load_jsonl(path: Union[str, Path]) -> list:
+    """
+    Carga un fichero JSONL, una línea por objeto.
+
+    Las líneas que no se pueden decodificar (p. ej. la última, si el proceso
+    se interrumpió a mitad de escritura) se ignoran.
+
+    Args:
+        path: Ruta del fichero
+
+    Returns:
+        Lista de objetos deserializados
+    """
+    loads = orjson.loads if orjson is not None else json.loads
+    items = []
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                items.append(loads(line))
+            except ValueError:
+                continue
+    return items
@@ -0,0 +1,70 @@
+"""
+Tests de lectura y escritura de JSON/JSONL (json_io).
+"""
+
+import pytest
+
+from src.utils import json_io
+from src.utils.json_io import dump_json, jsonl_line, load_json, load_jsonl
+
+DATA = [{"id": "EXP-1", "empresa": "Iberdrola España", "importe": 1.5}, {"id": "EXP-2"}]
+
+
+def test_dump_and_load_roundtrip(tmp_path):
+    path = tmp_path / "expedientes.json"
+    dump_json(DATA, path)
+
+    assert load_json(path) == DATA
+    # UTF-8 sin escapar
+    assert "España" in path.read_text(encoding="utf-8")
+    assert not (tmp_path / "expedientes.json.tmp").exists()
+
+
+def test_dump_is_atomic_on_failure(tmp_path):
+    path = tmp_path / "expedientes.json"
+    dump_json(DATA, path)
+
+    with pytest.raises(TypeError):
+        dump_json([{"id": "EXP-3", "no_serializable": object()}], path)
+
+    # El fichero anterior sigue intacto y no queda el temporal
+    assert load_json(path) == DATA
+    assert not (tmp_path / "expedientes.json.tmp").exists()
+
+
+def test_zst_roundtrip(tmp_path):
+    if json_io.zstd is None:
+        pytest.skip("zstd no disponible (extra \"fast\")")
+    path = tmp_path / "expedientes.json.zst"
+    dump_json(DATA, path)
+
+    assert path.read_bytes()[:4] == b"\x28\xb5\x2f\xfd"  # magic de zstd
+    assert load_json(path) == DATA
+
+
+def test_zst_without_zstd_raises(tmp_path, monkeypatch):
+    monkeypatch.setattr(json_io, "zstd", None)
+
+    with pytest.raises(RuntimeError):
+        dump_json(DATA, tmp_path / "expedientes.json.zst")
+    assert not (tmp_path / "expedientes.json.zst.tmp").exists()
+
+
+def test_load_jsonl_skips_bad_lines(tmp_path):
+    path = tmp_path / "checkpoint.jsonl"
+    path.write_bytes(
+        jsonl_line(DATA[0])
+        + b"\n"
+        + b"{esto no es json}\n"
+        + jsonl_line(DATA[1])
+        + b'{"id": "EXP-3", "resul'
+    )
+
+    assert load_jsonl(path) == DATA
+
+
+def test_jsonl_line_is_one_line():
+    line = jsonl_line({"texto": "PRIMERO.-\nDesestimar"})
+
+    assert line.endswith(b"\n")
+    assert line.count(b"\n") == 1
@@ -0,0 +1,143 @@
+"""
+Tests de la traducción de patrones del clasificador a RE2 (regex_engine).
+
+Cada patrón del clasificador o se traduce a RE2 o se queda en `re`; si se
+traduce, RE2 tiene que encontrar exactamente las mismas coincidencias.
+"""
+
+import re
+
+import pytest
+
+from src.analysis import regex_engine
+from src.analysis.classifier import (
+    _HIGH_CONFIDENCE_SOURCES,
+    _LAST_RESORT_PATTERNS,
+    ResolutionClassifier,
+)
+from src.analysis.regex_engine import _to_re2, compile_pattern, fold_case, lowercase_pattern
+
+
+def _classifier_patterns() -> list[tuple[str, int]]:
+    """(patrón, flags) tal y como los compila el clasificador."""
+    patterns = [
+        (p, re.MULTILINE | re.DOTALL)
+        for p in ResolutionClassifier.SECTION_PATTERNS_STRICT + ResolutionClassifier.SECTION_PATTERNS_FLEXIBLE
+    ]
+    patterns += [
+        (lowercase_pattern(p), re.DOTALL)
+        for category_patterns in ResolutionClassifier.CATEGORIES.values()
+        for p in category_patterns
+    ]
+    patterns += [
+        (p, re.IGNORECASE)
+        for category_patterns in _HIGH_CONFIDENCE_SOURCES.values()
+        for p in category_patterns
+    ]
+    return patterns
+
+
+CLASSIFIER_PATTERNS = _classifier_patterns()
+
+SAMPLE_TEXTS = [
+    (
+        "Madrid, 12 de marzo de 2024\n\nVistos los antecedentes, la Sala de Supervisión\n"
+        "RESUELVE:\n\nPRIMERO.- Desestimar el conflicto de acceso planteado por IBERDROLA\n"
+        "contra la denegación de EDISTRIBUCIÓN, sin perjuicio de lo indicado.\n"
+        "SEGUNDO.- Dar traslado a las partes.\n\nComuníquese esta resolución."
+    ),
+    (
+        "La Sala ACUERDA\nÚNICO. Estimar parcialmente el recurso y declarar la nulidad de la\n"
+        "comunicación. Reconocer a ENDESA el derecho de acceso. Ordenar a la distribuidora que\n"
+        "conecte la instalación. El presente acuerdo se notificará."
+    ),
+    (
+        "por todo lo cual, acuerda,\n\nDeclarar concluso el procedimiento por desaparición\n"
+        "sobrevenida de objeto y archivar las actuaciones. Inadmitir a trámite la solicitud.\n"
+        "Contra la presente resolución cabe recurso."
+    ),
+    (
+        "FALLAMOS: desestimamos el recurso y confirmamos la resolución. İNADMITIR la "
+        "ſatisfacción extraprocesal; no ha lugar a la estimación. Considerar que, a la vista\n"
+        "de lo anterior, no se ha producido incumplimiento.\u2028Así lo pronunciamos."
+    ),
+    (
+        "Aceptar de plano el desistimiento. Aceptar, conforme al artículo 94 de la Ley 39/2015. "
+        "Proceder al archivo de las actuaciones por pérdida sobrevenida de su objeto y falta de "
+        "objeto. Tener por desistida a la solicitante. Terminación del procedimiento. No procede "
+        "la suspensión. Informar a la sociedad mercantil que no procede. Corregir el error y "
+        "aclarar que la referencia es otra. Remitir el expediente al órgano competente. Declarar "
+        "resuelto el conflicto por satisfacción extraprocesal. Desestimar las reclamaciones. "
+        "Declarar conforme a derecho la denegación. Confirmar la actuación. Denegar el acceso y "
+        "denegar a Naturgy. Queda justificada la denegación. Estimar el escrito de disconformidad. "
+        "Estimar, exclusivamente, la pretensión. Estimación parcial de los recursos. Dejar sin "
+        "efecto la comunicación. Requerir a la distribuidora para que informe. Anular la resolución. "
+        "Declarar no ajustada a Derecho la actuación. Se considera sin efecto. Hacer efectivo el "
+        "derecho. Dar conformidad previa a la operación. Declarar que las condiciones de la "
+        "autorización dan adecuado\xa0cumplimiento. Resolver las discrepancias al objeto de "
+        "garantizar el acceso. Fallo: se estima el recurso."
+    ),
+]
+
+
+def _matches(compiled, text: str) -> list:
+    return [(m.span(), m.groups()) for m in compiled.finditer(text)]
+
+
+@pytest.mark.parametrize("pattern, flags", CLASSIFIER_PATTERNS)
+def test_classifier_pattern_translates_or_falls_back(monkeypatch, pattern, flags):
+    monkeypatch.setattr(regex_engine, "USE_RE2", True)
+    compiled = compile_pattern(pattern, flags)
+
+    if isinstance(compiled, re.Pattern):
+        # Sin traducción (o sin RE2): el patrón original con sus flags, tal cual
+        assert compiled.pattern == pattern
+        assert compiled.flags & flags == flags
+    else:
+        assert _to_re2(pattern, flags) is not None
+
+
+@pytest.mark.parametrize("pattern, flags", CLASSIFIER_PATTERNS)
+def test_classifier_pattern_same_matches_with_re2(pattern, flags):
+    re2 = pytest.importorskip("re2")
+    translated = _to_re2(pattern, flags)
+    if translated is None:
+        pytest.skip("sin traducción a RE2: se compila con re")
+    try:
+        compiled = re2.compile(translated)
+    except Exception:
+        pytest.skip("RE2 rechaza el patrón: se compila con re")
+
+    expected = re.compile(pattern, flags)
+    for sample in SAMPLE_TEXTS:
+        # Los patrones de categoría se buscan sobre el texto en minúsculas
+        for text in (sample, fold_case(sample)):
+            assert _matches(compiled, text) == _matches(expected, text)
+
+
+def test_word_boundary_patterns_fall_back():
+    # \b no tiene la semántica Unicode de `re` en RE2
+    for compiled in _LAST_RESORT_PATTERNS.values():
+        assert _to_re2(compiled.pattern, re.IGNORECASE) is None
+
+
+def test_compile_pattern_uses_re2_when_enabled(monkeypatch):
+    re2 = pytest.importorskip("re2")
+    monkeypatch.setattr(regex_engine, "USE_RE2", True)
+    monkeypatch.setattr(regex_engine, "re2", re2)
+
+    compiled = compile_pattern(r"desestim(?:ar?|e)\s+el\s+recurso", re.IGNORECASE)
+    assert not isinstance(compiled, re.Pattern)
+    assert compiled.search("Se DESESTIMA el  recurso") is not None
+
+    fallback = compile_pattern(r"\bestim(?:ar?|e)\b(?!\s*que)", re.IGNORECASE)
+    assert isinstance(fallback, re.Pattern)
+
+
+def test_compile_pattern_without_re2_uses_re(monkeypatch):
+    monkeypatch.setattr(regex_engine, "USE_RE2", True)
+    monkeypatch.setattr(regex_engine, "re2", None)
+
+    compiled = compile_pattern(r"dar\s+traslado", re.IGNORECASE)
+    assert isinstance(compiled, re.Pattern)
+    assert compiled.flags & re.IGNORECASE
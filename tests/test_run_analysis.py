@@ -0,0 +1,190 @@
+"""
+Tests del checkpoint JSONL de run_analysis (reanudar una ejecución interrumpida).
+"""
+
+import pytest
+
+from scripts import run_analysis
+from src.analysis.classifier import CLASSIFIER_VERSION
+from src.utils.json_io import dump_json, jsonl_line, load_json, load_jsonl
+
+RESOLUTION_TEXT = (
+    "Vistos los antecedentes, la Sala de Supervisión Regulatoria\nRESUELVE:\n\n"
+    "ÚNICO.- Desestimar el conflicto de acceso a la red de distribución planteado "
+    "por la sociedad solicitante.\n\nComuníquese esta resolución."
+)
+
+
+class FakePDFHandler:
+    """Sustituye a PDFHandler: devuelve un texto fijo y anota las URLs pedidas."""
+
+    def __init__(self):
+        self.urls = []
+
+    def extract_text_from_url(self, url):
+        self.urls.append(url)
+        return RESOLUTION_TEXT
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    """Directorios temporales, PDFHandler falso y dos expedientes de entrada."""
+    handler = FakePDFHandler()
+    monkeypatch.setattr(run_analysis, "PROCESSED_DIR", tmp_path)
+    monkeypatch.setattr(run_analysis, "OUTPUT_DIR", tmp_path / "output")
+    monkeypatch.setattr(run_analysis, "get_pdf_handler", lambda **kwargs: handler)
+
+    dump_json(
+        [
+            {"id": "EXP-1", "url_resolucion": "https://www.cnmc.es/1.pdf"},
+            {"id": "EXP-2", "url_resolucion": "https://www.cnmc.es/2.pdf"},
+        ],
+        tmp_path / "in.json",
+    )
+    return tmp_path, handler
+
+
+def _checkpoint_record(exp_id, url, version=CLASSIFIER_VERSION, resultado="ARCHIVADO"):
+    return {
+        "id": exp_id,
+        "url_resolucion": url,
+        "resultado_clasificado": resultado,
+        "confianza": "alta",
+        "texto_clave": "del checkpoint",
+        "version_clasificador": version,
+    }
+
+
+def _run(**kwargs):
+    kwargs.setdefault("window", 0)
+    return run_analysis.run_analysis(
+        input_file="in.json", output_file="out.json", max_workers=1, parse_workers=0, **kwargs
+    )
+
+
+def _fail_final_dump(monkeypatch):
+    """Hace fallar el guardado final para que el checkpoint no se borre."""
+    def _raise(data, path):
+        raise RuntimeError("guardado interrumpido")
+    monkeypatch.setattr(run_analysis, "dump_json", _raise)
+
+
+def test_resume_skips_checkpointed_expedientes(env):
+    tmp_path, handler = env
+    (tmp_path / "out.json.partial.jsonl").write_bytes(
+        jsonl_line(_checkpoint_record("EXP-1", "https://www.cnmc.es/1.pdf"))
+    )
+
+    results = _run()
+
+    assert handler.urls == ["https://www.cnmc.es/2.pdf"]
+    assert results == {"ARCHIVADO": 1, "DESESTIMADO": 1}
+    by_id = {exp["id"]: exp for exp in load_json(tmp_path / "out.json")}
+    assert by_id["EXP-1"]["texto_clave"] == "del checkpoint"
+    assert by_id["EXP-2"]["resultado_clasificado"] == "DESESTIMADO"
+    assert not (tmp_path / "out.json.partial.jsonl").exists()
+
+
+def test_resume_after_truncated_line(env, monkeypatch):
+    tmp_path, handler = env
+    partial = tmp_path / "out.json.partial.jsonl"
+    # Última línea cortada a mitad de escritura (sin salto de línea)
+    truncated = jsonl_line(_checkpoint_record("EXP-2", "https://www.cnmc.es/2.pdf"))[:-20]
+    partial.write_bytes(jsonl_line(_checkpoint_record("EXP-1", "https://www.cnmc.es/1.pdf")) + truncated)
+    _fail_final_dump(monkeypatch)
+
+    with pytest.raises(RuntimeError):
+        _run()
+
+    # La línea cortada se ignora y la nueva no se pega a ella
+    assert handler.urls == ["https://www.cnmc.es/2.pdf"]
+    records = load_jsonl(partial)
+    assert [rec["id"] for rec in records] == ["EXP-1", "EXP-2"]
+    assert records[1]["resultado_clasificado"] == "DESESTIMADO"
+
+
+def test_checkpoint_with_other_url_is_ignored(env):
+    tmp_path, handler = env
+    (tmp_path / "out.json.partial.jsonl").write_bytes(
+        jsonl_line(_checkpoint_record("EXP-1", "https://www.cnmc.es/antigua.pdf"))
+    )
+
+    results = _run()
+
+    assert sorted(handler.urls) == ["https://www.cnmc.es/1.pdf", "https://www.cnmc.es/2.pdf"]
+    assert results == {"DESESTIMADO": 2}
+
+
+def test_checkpoint_with_other_version_is_ignored(env):
+    tmp_path, handler = env
+    (tmp_path / "out.json.partial.jsonl").write_bytes(
+        jsonl_line(_checkpoint_record("EXP-1", "https://www.cnmc.es/1.pdf", version="0"))
+    )
+
+    results = _run()
+
+    assert sorted(handler.urls) == ["https://www.cnmc.es/1.pdf", "https://www.cnmc.es/2.pdf"]
+    assert results == {"DESESTIMADO": 2}
+
+
+def test_checkpoint_with_other_window_is_ignored(env):
+    tmp_path, handler = env
+    (tmp_path / "out.json.partial.jsonl").write_bytes(
+        jsonl_line(_checkpoint_record("EXP-1", "https://www.cnmc.es/1.pdf", version=f"{CLASSIFIER_VERSION}-w5000"))
+        + jsonl_line(_checkpoint_record("EXP-2", "https://www.cnmc.es/2.pdf", version=f"{CLASSIFIER_VERSION}-w8000"))
+    )
+
+    results = _run(window=8000)
+
+    # Solo se retoma el resultado clasificado con la misma ventana
+    assert handler.urls == ["https://www.cnmc.es/1.pdf"]
+    assert results == {"ARCHIVADO": 1, "DESESTIMADO": 1}
+    by_id = {exp["id"]: exp for exp in load_json(tmp_path / "out.json")}
+    assert by_id["EXP-1"]["version_clasificador"] == f"{CLASSIFIER_VERSION}-w8000"
+
+
+def test_previous_windowed_output_is_reclassified_on_full_text(env):
+    tmp_path, handler = env
+    dump_json(
+        [
+            _checkpoint_record("EXP-1", "https://www.cnmc.es/1.pdf"),
+            _checkpoint_record("EXP-2", "https://www.cnmc.es/2.pdf", version=f"{CLASSIFIER_VERSION}-w5000"),
+        ],
+        tmp_path / "out.json",
+    )
+
+    results = _run()
+
+    assert handler.urls == ["https://www.cnmc.es/2.pdf"]
+    assert results == {"ARCHIVADO": 1, "DESESTIMADO": 1}
+
+
+def test_previous_output_with_other_version_is_reclassified(env):
+    tmp_path, handler = env
+    dump_json(
+        [
+            _checkpoint_record("EXP-1", "https://www.cnmc.es/1.pdf"),
+            _checkpoint_record("EXP-2", "https://www.cnmc.es/2.pdf", version="0"),
+        ],
+        tmp_path / "out.json",
+    )
+
+    results = _run()
+
+    assert handler.urls == ["https://www.cnmc.es/2.pdf"]
+    assert results == {"ARCHIVADO": 1, "DESESTIMADO": 1}
+
+
+def test_no_resume_truncates_checkpoint(env, monkeypatch):
+    tmp_path, handler = env
+    partial = tmp_path / "out.json.partial.jsonl"
+    partial.write_bytes(jsonl_line(_checkpoint_record("EXP-1", "https://www.cnmc.es/1.pdf")))
+    _fail_final_dump(monkeypatch)
+
+    with pytest.raises(RuntimeError):
+        _run(resume=False)
+
+    assert sorted(handler.urls) == ["https://www.cnmc.es/1.pdf", "https://www.cnmc.es/2.pdf"]
+    records = load_jsonl(partial)
+    assert sorted(rec["id"] for rec in records) == ["EXP-1", "EXP-2"]
+    assert all(rec["resultado_clasificado"] == "DESESTIMADO" for rec in records)
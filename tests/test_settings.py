@@ -0,0 +1,33 @@
+"""
+Tests de la configuración (get_filters).
+"""
+
+import pytest
+
+from config.settings import DEFAULT_FILTERS, get_filters
+
+
+def test_get_filters_defaults():
+    filters = get_filters()
+
+    assert filters == DEFAULT_FILTERS
+    assert filters is not DEFAULT_FILTERS
+
+
+def test_get_filters_overrides_and_ignores_none():
+    filters = get_filters(year_from=2020, tipo_expediente=None)
+
+    assert filters["year_from"] == 2020
+    assert filters["tipo_expediente"] == DEFAULT_FILTERS["tipo_expediente"]
+
+
+def test_get_filters_does_not_modify_defaults():
+    get_filters(year_to=1999)["ambito"] = "Telecomunicaciones"
+
+    assert DEFAULT_FILTERS["year_to"] != 1999
+    assert DEFAULT_FILTERS["ambito"] != "Telecomunicaciones"
+
+
+def test_get_filters_unknown_key():
+    with pytest.raises(KeyError):
+        get_filters(anio=2024)